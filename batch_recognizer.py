@@ -0,0 +1,169 @@
+from argparse import ArgumentParser
+from multiprocessing import Pool, cpu_count
+import os
+import sys
+import time
+
+import cv2
+
+
+# Pipeline loaded by parent process before forking workers. Workers share its
+# pages copy-on-write instead of loading their own copy of the models.
+_pipeline = None
+
+
+def _initialize_worker():
+    '''
+    Initialize worker process.
+    '''
+
+    # Each worker uses one core, avoid oversubscription by OpenCV threads
+    # and by threads of detector.
+    cv2.setNumThreads(1)
+    _pipeline.detector.threads = 1
+
+def _recognize(indexed_image_path):
+    '''
+    Recognize license plate in worker process. Return error result if
+    recognition fails.
+    '''
+
+    index, image_path = indexed_image_path
+    start = time.time()
+
+    # Error of one image must not abort the other images of the batch.
+    try:
+        result = _pipeline.recognize_path(image_path)
+    except Exception as error:
+        from models.logger import Logger
+        from recognition_pipeline import RECOGNITION_ERROR
+
+        Logger(__name__).log(Logger.ERROR, "Error to recognize %s: %s", image_path, error)
+        result = RECOGNITION_ERROR
+
+    return index, image_path, result, os.getpid(), time.time() - start
+
+
+class WorkerStatistics:
+    '''
+    Throughput of one worker.
+    '''
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.images = 0
+        self.busy_time = 0.0
+
+    def add(self, elapsed_time):
+        '''
+        Add processed image.
+        '''
+        self.images += 1
+        self.busy_time += elapsed_time
+
+    def throughput(self):
+        '''
+        Images per second while busy.
+        '''
+        if self.busy_time > 0:
+            return self.images / self.busy_time
+
+        return 0.0
+
+
+class BatchRecognizer:
+    '''
+    Recognize license plates of many images using a pool of forked workers.
+    '''
+
+    def __init__(self, pipeline, workers=None, chunk_size=4):
+        self.pipeline = pipeline
+        self.workers = workers if workers is not None else cpu_count()
+        self.chunk_size = chunk_size
+        self.statistics = {}
+        self.total_images = 0
+        self.total_time = 0.0
+
+    def recognize(self, image_paths):
+        '''
+        Recognize license plates, yielding (image path, result) in input order.
+        '''
+
+        global _pipeline
+        _pipeline = self.pipeline
+
+        self.statistics = {}
+        self.total_images = 0
+        start = time.time()
+
+        # Fork workers only after models are loaded.
+        pool = Pool(self.workers, _initialize_worker)
+
+        try:
+            for _, image_path, result, pid, elapsed_time in pool.imap(_recognize, enumerate(image_paths), self.chunk_size):
+                if pid not in self.statistics:
+                    self.statistics[pid] = WorkerStatistics(pid)
+
+                self.statistics[pid].add(elapsed_time)
+                self.total_images += 1
+                yield image_path, result
+
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            self.total_time = time.time() - start
+
+    def report(self, output_file=sys.stderr):
+        '''
+        Write throughput of each worker and of the whole batch.
+        '''
+
+        for pid in sorted(self.statistics):
+            statistics = self.statistics[pid]
+            output_file.write("Worker %d: %d images, %.2f images/s\n" % (pid, statistics.images, statistics.throughput()))
+
+        if self.total_time > 0:
+            output_file.write("Total: %d images in %.2f s, %.2f images/s with %d workers\n" % \
+                              (self.total_images, self.total_time, self.total_images / self.total_time, self.workers))
+
+
+if __name__ == '__main__':
+    '''
+    Recognize license plates of many images using many processes.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Recognize license plates of many images using many processes.')
+    arg_parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=None, help='Number of worker processes')
+    arg_parser.add_argument('image_paths', nargs='+', help='Image paths, directories, or - to read paths from stdin')
+    arg_parser.add_argument('--log', dest='log', help='Logger levels, as "INFO,models.image=DEBUG"')
+    arg_parser.add_argument('--instrument', dest='instrument', nargs='?', const='-', \
+                            help='Measure time of pipeline stages in workers, appending records to JSON lines file if given')
+    arg_parser.add_argument('--profile', dest='profile', help='Runtime profile, as fast, balanced or accurate')
+    args = vars(arg_parser.parse_args())
+
+    from lpdetect import get_image_paths
+    from models.instrumentation import instrumentation
+    from models.logger import Logger
+    from recognition_pipeline import load_pipeline
+
+    # Load models once in parent process, before forking workers.
+    pipeline = load_pipeline(profile=args['profile'])
+    
+    if args['log']:
+        Logger.configure(args['log'])
+        
+    if args['instrument']:
+        instrumentation.enable(args['instrument'] if args['instrument'] != '-' else None)
+        
+    pipeline.warmup()
+    batch_recognizer = BatchRecognizer(pipeline, args['jobs'])
+
+    for image_path, result in batch_recognizer.recognize(get_image_paths(args['image_paths'])):
+        sys.stdout.write(image_path + "\t" + result + "\n")
+        sys.stdout.flush()
+
+    batch_recognizer.report()
@@ -0,0 +1,106 @@
+from argparse import ArgumentParser
+
+from models.files import Files
+from models.image import Image
+from models.image_buffers import ImageBuffers, buffers
+from recognition_pipeline import load_pipeline, NOT_FOUND, OPEN_ERROR
+
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class ImageCounter:
+    '''
+    Count data set in Image objects and bytes of data not shared with other
+    arrays.
+    '''
+    
+    def __init__(self):
+        self.images = 0
+        self.bytes = 0
+        self.set_image_data = Image._set_image_data
+    
+    def start(self):
+        counter = self
+        set_image_data = self.set_image_data
+        
+        def counted_set_image_data(image, data):
+            counter.images += 1
+            
+            # Views of buffers or of other images were not allocated.
+            if data.base is None:
+                counter.bytes += data.nbytes
+            set_image_data(image, data)
+        
+        Image._set_image_data = counted_set_image_data
+    
+    def stop(self):
+        Image._set_image_data = self.set_image_data
+
+
+def measure(pipeline, image_paths, use_buffers):
+    '''
+    Recognize images and return plates recognized, Image data set, bytes of
+    Image data, peak traced memory and buffers allocated.
+    '''
+    
+    ImageBuffers.enabled = use_buffers
+    counter = ImageCounter()
+    counter.start()
+    plates = 0
+    peak = 0
+    buffer_allocations = buffers.allocations
+    
+    try:
+        for image_path in image_paths:
+            if tracemalloc is not None:
+                tracemalloc.start()
+            
+            result = pipeline.recognize_path(image_path)
+            
+            if tracemalloc is not None:
+                peak += tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            
+            if result not in [NOT_FOUND, OPEN_ERROR]:
+                plates += 1
+    finally:
+        counter.stop()
+    
+    return plates, counter.images, counter.bytes, peak, buffers.allocations - buffer_allocations
+
+
+if __name__ == '__main__':
+    '''
+    Compare allocations per recognized plate with and without reusing image
+    buffers.
+    '''
+    
+    # Parses args.
+    arg_parser = ArgumentParser(description='Compare allocations with and without image buffers.')
+    arg_parser.add_argument('-d', '--directory', dest='directory', default='resources/testing/', help='Directory of images')
+    args = vars(arg_parser.parse_args())
+    
+    image_paths = Files(args['directory']).paths
+    pipeline = load_pipeline()
+    pipeline.warmup()
+    
+    if tracemalloc is None:
+        print "tracemalloc is not available, only Image data is counted."
+    
+    for use_buffers in [False, True]:
+        plates, images, image_bytes, peak, buffer_allocations = measure(pipeline, image_paths, use_buffers)
+        
+        if plates == 0:
+            continue
+        
+        line = "%-16s %d plates, %.1f Image data/plate, %.1f KB Image data/plate, %d buffers allocated" % \
+            ("buffers:" if use_buffers else "no buffers:", plates, images * 1.0 / plates, image_bytes / 1024.0 / plates, buffer_allocations)
+        
+        if tracemalloc is not None:
+            line += ", %.1f KB peak traced/plate" % (peak / 1024.0 / plates)
+        
+        print line
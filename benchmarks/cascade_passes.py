@@ -0,0 +1,61 @@
+from argparse import ArgumentParser
+import time
+
+import numpy as np
+
+from detector import Detector
+from models.files import Files
+from models.image import Image
+
+
+def detect(cascade_classifier, image, single_pass):
+    '''
+    Detect license plates and return them with time spent.
+    '''
+    
+    cascade_classifier.single_pass_cascade = single_pass
+    start = time.time()
+    license_plates = cascade_classifier.detect_using_cascade_classifier(image)
+    
+    return license_plates, time.time() - start
+
+
+if __name__ == '__main__':
+    '''
+    Compare cascade detection scanning image once for each configuration and
+    scanning image once.
+    '''
+    
+    # Parses args.
+    arg_parser = ArgumentParser(description='Compare multiple-pass and single-pass cascade detection.')
+    arg_parser.add_argument('-d', '--directory', dest='directory', default='resources/testing/', help='Directory of images')
+    arg_parser.add_argument('-o', '--overlap', dest='overlap', type=float, default=0.5, help='Minimum overlap to match candidates')
+    args = vars(arg_parser.parse_args())
+    
+    detector = Detector("classifier/cascade.xml", "classifier/svm_detector_hog.xml", "classifier/svm_detector_binary.xml", 96, 48)
+    multiple_pass_times = []
+    single_pass_times = []
+    matched = 0
+    total = 0
+    
+    for image_path in Files(args['directory']).paths:
+        image = detector.get_detection_image(Image(image_path))
+        multiple_pass_plates, multiple_pass_time = detect(detector.cascade_classifier, image, False)
+        single_pass_plates, single_pass_time = detect(detector.cascade_classifier, image, True)
+        multiple_pass_times.append(multiple_pass_time)
+        single_pass_times.append(single_pass_time)
+        
+        # Recall of candidates found by multiple passes.
+        for license_plate in multiple_pass_plates:
+            total += 1
+            
+            if any(license_plate.overlap(candidate) >= args['overlap'] for candidate in single_pass_plates):
+                matched += 1
+    
+    if len(multiple_pass_times) > 0:
+        print "Images: %d" % len(multiple_pass_times)
+        print "Multiple passes: %.2f ms/image" % (np.mean(multiple_pass_times) * 1000)
+        print "Single pass:     %.2f ms/image" % (np.mean(single_pass_times) * 1000)
+        
+        if total > 0:
+            print "Recall of multiple-pass candidates: %d/%d - %.1f%%" % (matched, total, matched * 100.0 / total)
@@ -0,0 +1,65 @@
+from argparse import ArgumentParser, SUPPRESS
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def load_models(mode, bundle_path):
+    '''
+    Load models from model files or bundle and return loading time.
+    '''
+    
+    start = time.time()
+    
+    from recognition_pipeline import RecognitionPipeline
+    
+    if mode == "bundle":
+        from model_bundle import ModelBundle
+        pipeline = RecognitionPipeline(bundle=ModelBundle(bundle_path))
+    else:
+        pipeline = RecognitionPipeline()
+    
+    # Models are loaded on first use.
+    pipeline.warmup()
+    
+    return time.time() - start
+
+def measure_cold_start(mode, bundle_path, repetitions):
+    '''
+    Measure cold start in new processes. Return process times and loading times.
+    '''
+    
+    process_times = []
+    loading_times = []
+    
+    for _ in range(repetitions):
+        start = time.time()
+        output = subprocess.check_output([sys.executable, "-m", "benchmarks.cold_start", "--child", mode, "-b", bundle_path])
+        process_times.append(time.time() - start)
+        loading_times.append(float(output.strip()))
+    
+    return process_times, loading_times
+
+
+if __name__ == '__main__':
+    '''
+    Compare cold start using model files and using model bundle.
+    '''
+    
+    # Parses args.
+    arg_parser = ArgumentParser(description='Compare cold start using model files and using model bundle.')
+    arg_parser.add_argument('-b', '--bundle', dest='bundle_path', default='classifier/models.bundle', help='Bundle path')
+    arg_parser.add_argument('-n', '--repetitions', dest='repetitions', type=int, default=10, help='Number of processes started for each mode')
+    arg_parser.add_argument('--child', dest='child', choices=['files', 'bundle'], help=SUPPRESS)
+    args = vars(arg_parser.parse_args())
+    
+    if args['child'] is not None:
+        # Print loading time to parent.
+        print load_models(args['child'], args['bundle_path'])
+    else:
+        for mode in ["files", "bundle"]:
+            process_times, loading_times = measure_cold_start(mode, args['bundle_path'], args['repetitions'])
+            print "%-6s process: %.3f s (median) model loading: %.3f s (median)" % \
+                  (mode, np.median(process_times), np.median(loading_times))
@@ -0,0 +1,190 @@
+from argparse import ArgumentParser, SUPPRESS
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+MODES = ["detection", "ocr", "end_to_end"]
+
+# Metrics compared with baseline, and if greater values are better.
+COMPARED_METRICS = [("images_per_second", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False), \
+                    ("peak_rss_mb", False)]
+
+
+def get_peak_rss():
+    '''
+    Get peak resident set size of process in megabytes.
+    '''
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, Mac OS X reports bytes.
+    if sys.platform == "darwin":
+        return peak / (1024.0 * 1024.0)
+
+    return peak / 1024.0
+
+def summarize(latencies, total_time):
+    '''
+    Get throughput and latency percentiles of latencies in seconds.
+    '''
+
+    latencies = np.array(latencies) * 1000
+
+    return {"images": len(latencies), \
+            "images_per_second": len(latencies) / total_time if total_time > 0 else 0.0, \
+            "p50_ms": float(np.percentile(latencies, 50)), \
+            "p95_ms": float(np.percentile(latencies, 95)), \
+            "p99_ms": float(np.percentile(latencies, 99)), \
+            "peak_rss_mb": get_peak_rss()}
+
+def run_mode(mode, count, seed, warmup):
+    '''
+    Measure mode on synthetic scenes in current process.
+    '''
+
+    from benchmarks.synthetic import generate_scenes
+    from models.image_loader import load_image
+    from recognition_pipeline import load_pipeline
+
+    scenes = generate_scenes(count + warmup, seed)
+    pipeline = load_pipeline()
+    pipeline.warmup()
+    resize_width = pipeline.detector.profile.resize_width
+
+    if mode == "ocr":
+        # Detect once, only character recognition is measured.
+        license_plates = []
+
+        for encoded, _, _ in scenes:
+            license_plate = pipeline.detector.detect_license_plate(load_image(buffer=encoded, detection_width=resize_width))
+
+            if license_plate is not None:
+                license_plates.append(license_plate)
+
+        if len(license_plates) == 0:
+            raise ValueError("No license plate detected in synthetic scenes.")
+
+        # Repeat plates found to measure the same number of samples.
+        samples = [license_plates[index % len(license_plates)] for index in range(count + warmup)]
+        process = pipeline.recognizer.predict
+    elif mode == "detection":
+        samples = [encoded for encoded, _, _ in scenes]
+        process = lambda encoded: pipeline.detector.detect_license_plate(load_image(buffer=encoded, \
+                                                                                    detection_width=resize_width))
+    else:
+        samples = [encoded for encoded, _, _ in scenes]
+        process = pipeline.recognize_buffer
+
+    for sample in samples[:warmup]:
+        process(sample)
+
+    latencies = []
+    start = time.time()
+
+    for sample in samples[warmup:]:
+        sample_start = time.time()
+        process(sample)
+        latencies.append(time.time() - sample_start)
+
+    result = summarize(latencies, time.time() - start)
+    result["mode"] = mode
+
+    return result
+
+def run_child(mode, count, seed, warmup):
+    '''
+    Measure mode in new process, so peak memory of each mode is separated.
+    '''
+
+    output = subprocess.check_output([sys.executable, "-m", "benchmarks.end_to_end", "--child", mode, \
+                                      "-n", str(count), "--seed", str(seed), "--warmup", str(warmup)])
+
+    return json.loads(output.strip().split("\n")[-1])
+
+def compare(results, baseline, threshold):
+    '''
+    Compare results with baseline. Return list of regressions greater than
+    threshold, as fraction of baseline value.
+    '''
+
+    regressions = []
+
+    for mode, result in results.items():
+        if mode not in baseline:
+            continue
+
+        for metric, greater_is_better in COMPARED_METRICS:
+            old_value = baseline[mode].get(metric)
+            new_value = result.get(metric)
+
+            if not old_value or new_value is None:
+                continue
+
+            change = (new_value - old_value) / old_value
+
+            if greater_is_better:
+                change = -change
+
+            if change > threshold:
+                regressions.append((mode, metric, old_value, new_value, change))
+
+    return regressions
+
+
+if __name__ == '__main__':
+    '''
+    Measure throughput, latency and peak memory of detection, character
+    recognition and end to end recognition on synthetic scenes.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Benchmark detection, character recognition and end to end recognition.')
+    arg_parser.add_argument('-n', '--count', dest='count', type=int, default=200, help='Number of measured images')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=0, help='Random seed of synthetic scenes')
+    arg_parser.add_argument('--warmup', dest='warmup', type=int, default=10, help='Number of images processed before measuring')
+    arg_parser.add_argument('-m', '--modes', dest='modes', nargs='+', choices=MODES, default=MODES, help='Measured modes')
+    arg_parser.add_argument('-o', '--output', dest='output', help='Save results as baseline JSON file')
+    arg_parser.add_argument('-b', '--baseline', dest='baseline', help='Baseline JSON file to compare results')
+    arg_parser.add_argument('-t', '--threshold', dest='threshold', type=float, default=0.1, \
+                            help='Maximum change allowed compared to baseline, as fraction')
+    arg_parser.add_argument('--child', dest='child', choices=MODES, help=SUPPRESS)
+    args = vars(arg_parser.parse_args())
+
+    if args['child'] is not None:
+        # Print result to parent.
+        print json.dumps(run_mode(args['child'], args['count'], args['seed'], args['warmup']))
+        sys.exit(0)
+
+    results = {}
+
+    for mode in args['modes']:
+        results[mode] = run_child(mode, args['count'], args['seed'], args['warmup'])
+        result = results[mode]
+        print "%-10s %8.2f images/s p50: %7.2f ms p95: %7.2f ms p99: %7.2f ms peak RSS: %7.1f MB" % \
+              (mode, result["images_per_second"], result["p50_ms"], result["p95_ms"], result["p99_ms"], result["peak_rss_mb"])
+
+    if args['output']:
+        with open(args['output'], "w") as output_file:
+            json.dump({"count": args['count'], "seed": args['seed'], "results": results}, output_file, indent=2, sort_keys=True)
+
+    if args['baseline']:
+        with open(args['baseline']) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        if baseline.get("count") != args['count'] or baseline.get("seed") != args['seed']:
+            print "Warning: baseline was measured with count %s and seed %s." % (baseline.get("count"), baseline.get("seed"))
+
+        regressions = compare(results, baseline["results"], args['threshold'])
+
+        for mode, metric, old_value, new_value, change in regressions:
+            print "Regression: %s %s %.2f -> %.2f (%+.1f%%)" % (mode, metric, old_value, new_value, change * 100)
+
+        if len(regressions) > 0:
+            sys.exit(1)
+
+        print "No regression greater than %.1f%%." % (args['threshold'] * 100)
@@ -0,0 +1,95 @@
+from argparse import ArgumentParser
+import time
+
+from models.lookup_tables import apply_lookup_table, CONTRAST_TABLE, \
+    DOUBLE_TABLE, INVERT_TABLE
+import numpy as np
+
+
+def contrast_using_arrays(data):
+    '''
+    Contrast image as done before lookup tables. Return result and arrays
+    allocated.
+    '''
+    
+    temporaries = [data.astype(int)]
+    temporaries.append(np.power(temporaries[-1], 2))
+    temporaries.append(np.multiply(temporaries[-1], 1.0 / 255))
+    temporaries.append(np.uint8(temporaries[-1]))
+    
+    return temporaries[-1], temporaries
+
+def double_using_arrays(data):
+    '''
+    Double intensities as done before lookup tables. Return result and arrays
+    allocated.
+    '''
+    
+    temporaries = [data.astype(int)]
+    temporaries.append(temporaries[-1] * 2)
+    temporaries.append(np.uint8(temporaries[-1]))
+    
+    return temporaries[-1], temporaries
+
+def invert_using_arrays(data):
+    '''
+    Invert intensities using numpy. Return result and arrays allocated.
+    '''
+    
+    temporaries = [255 - data]
+    
+    return temporaries[-1], temporaries
+
+def using_lookup_table(table):
+    '''
+    Get operation applying lookup table. Return result and arrays allocated.
+    '''
+    
+    def operation(data):
+        result = apply_lookup_table(data, table)
+        return result, [result]
+    
+    return operation
+
+def measure(operation, data, repetitions):
+    '''
+    Get milliseconds per frame, bytes allocated per frame and result.
+    '''
+    
+    result, temporaries = operation(data)
+    start = time.time()
+    
+    for _ in range(repetitions):
+        operation(data)
+    
+    elapsed_time = (time.time() - start) * 1000 / repetitions
+    
+    return elapsed_time, sum(temporary.nbytes for temporary in temporaries), result
+
+
+if __name__ == '__main__':
+    '''
+    Compare time and memory of point operations using numpy arrays and
+    lookup tables.
+    '''
+    
+    # Parses args.
+    arg_parser = ArgumentParser(description='Compare point operations using numpy arrays and lookup tables.')
+    arg_parser.add_argument('-r', '--repetitions', dest='repetitions', type=int, default=20, help='Repetitions of each operation')
+    args = vars(arg_parser.parse_args())
+    
+    operations = [("contrast", contrast_using_arrays, using_lookup_table(CONTRAST_TABLE)), \
+                  ("double", double_using_arrays, using_lookup_table(DOUBLE_TABLE)), \
+                  ("invert", invert_using_arrays, using_lookup_table(INVERT_TABLE))]
+    
+    # Detection image and 12MP camera frame.
+    for width, height in [(400, 300), (4000, 3000)]:
+        data = np.random.randint(0, 256, (height, width)).astype(np.uint8)
+        print "%dx%d" % (width, height)
+        
+        for name, using_arrays, using_table in operations:
+            arrays_time, arrays_bytes, arrays_result = measure(using_arrays, data, args['repetitions'])
+            table_time, table_bytes, table_result = measure(using_table, data, args['repetitions'])
+            
+            print "  %-8s arrays: %8.3f ms %10d bytes | lookup table: %8.3f ms %10d bytes | same result: %s" % \
+                (name, arrays_time, arrays_bytes, table_time, table_bytes, np.array_equal(arrays_result, table_result))
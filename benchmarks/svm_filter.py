@@ -0,0 +1,78 @@
+from argparse import ArgumentParser
+import time
+
+from detector import Detector
+from models.files import Files
+from models.filter_license_plate import FilterLicensePlate
+from models.image import Image
+from models.point import Point
+
+
+def filter_one_by_one(license_plates, image, svm_detector, image_width, image_height):
+    '''
+    Filter license plates predicting one sample at a time, as done before
+    batch prediction.
+    '''
+    
+    filtered_license_plates = []
+    
+    for license_plate in license_plates:
+        license_plate_image = image.crop(Point(license_plate.x, license_plate.y), \
+                                         Point(license_plate.x + license_plate.w, \
+                                               license_plate.y + license_plate.h))
+        license_plate_image = license_plate_image.resize(image_width, image_height)
+        
+        if svm_detector.predict(license_plate_image) > 0:
+            filtered_license_plates.append(license_plate)
+        else:
+            license_plate_image_old = Image(image=license_plate_image.data)
+            license_plate_image_old.filter_median(size=3)
+            
+            if svm_detector.predict(license_plate_image_old) > 0:
+                filtered_license_plates.append(license_plate)
+    
+    return filtered_license_plates
+
+
+if __name__ == '__main__':
+    '''
+    Compare time per candidate of SVM filter predicting one sample at a time
+    and predicting all samples in one call.
+    '''
+    
+    # Parses args.
+    arg_parser = ArgumentParser(description='Compare one by one and batch SVM candidate filter.')
+    arg_parser.add_argument('-d', '--directory', dest='directory', default='resources/testing/', help='Directory of images')
+    args = vars(arg_parser.parse_args())
+    
+    detector = Detector("classifier/cascade.xml", "classifier/svm_detector_hog.xml", "classifier/svm_detector_binary.xml", 96, 48)
+    lp_filter = FilterLicensePlate()
+    one_by_one_time = 0.0
+    batch_time = 0.0
+    candidates = 0
+    mismatches = 0
+    
+    for image_path in Files(args['directory']).paths:
+        image = detector.get_detection_image(Image(image_path))
+        license_plates = detector.cascade_classifier.detect_using_cascade_classifier(image)
+        image.filter_median(size=3)
+        image.contrast()
+        license_plates += image.compute_rectangles_for_plates()
+        candidates += len(license_plates)
+        
+        start = time.time()
+        one_by_one = filter_one_by_one(license_plates, image, detector.svm_detector, detector.image_width, detector.image_height)
+        one_by_one_time += time.time() - start
+        
+        start = time.time()
+        batch = lp_filter.filter_using_svm(license_plates, image, detector.svm_detector, detector.image_width, detector.image_height)
+        batch_time += time.time() - start
+        
+        if [id(license_plate) for license_plate in one_by_one] != [id(license_plate) for license_plate in batch]:
+            mismatches += 1
+    
+    if candidates > 0:
+        print "Candidates: %d" % candidates
+        print "One by one: %.3f ms/candidate" % (one_by_one_time * 1000 / candidates)
+        print "Batch:      %.3f ms/candidate" % (batch_time * 1000 / candidates)
+        print "Images with different results: %d" % mismatches
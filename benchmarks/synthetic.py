@@ -0,0 +1,160 @@
+from argparse import ArgumentParser
+import os
+import string
+
+import cv2
+
+from models.config_data import ConfigData
+from models.point import Point
+from models.quadrilaterals import Quadrilaterals
+import numpy as np
+
+
+# Size of rendered plate, proportional to a 40 x 13 cm plate.
+PLATE_WIDTH = 400
+PLATE_HEIGHT = 130
+
+# Ranges of variations applied to scenes.
+PLATE_WIDTHS = (110, 220)
+PERSPECTIVE = 0.08  # Maximum corner displacement, as fraction of plate width.
+BLUR_SIGMAS = (0.0, 1.5)
+NOISE_SIGMAS = (0.0, 8.0)
+JPEG_QUALITIES = (80, 95)
+
+
+def random_plate_text(random):
+    '''
+    Get random plate text in AAA1111 format.
+    '''
+
+    letters = "".join(random.choice(list(string.ascii_uppercase), 3))
+    numbers = "".join(random.choice(list(string.digits), 4))
+
+    return letters + numbers
+
+def render_plate(text):
+    '''
+    Render gray plate with dark characters, as "AAA-1111".
+    '''
+
+    plate = np.empty((PLATE_HEIGHT, PLATE_WIDTH), dtype=np.uint8)
+    plate[:] = 200
+    cv2.rectangle(plate, (3, 3), (PLATE_WIDTH - 4, PLATE_HEIGHT - 4), 40, 4)
+
+    label = text[:3] + "-" + text[3:]
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    thickness = 9
+    (label_width, label_height), _ = cv2.getTextSize(label, font, 1.0, thickness)
+    scale = min((PLATE_WIDTH - 40) * 1.0 / label_width, (PLATE_HEIGHT - 50) * 1.0 / label_height)
+    (label_width, label_height), _ = cv2.getTextSize(label, font, scale, thickness)
+    origin = ((PLATE_WIDTH - label_width) / 2, (PLATE_HEIGHT + label_height) / 2)
+    cv2.putText(plate, label, origin, font, scale, 20, thickness)
+
+    return plate
+
+def render_background(random, width, height):
+    '''
+    Render background with gradient and random clutter.
+    '''
+
+    start, end = random.randint(40, 220, 2)
+    background = np.tile(np.linspace(start, end, width), (height, 1))
+
+    for _ in range(random.randint(5, 15)):
+        x, y = int(random.randint(0, width)), int(random.randint(0, height))
+        w, h = int(random.randint(10, width / 3)), int(random.randint(10, height / 3))
+        cv2.rectangle(background, (x, y), (x + w, y + h), float(random.randint(0, 256)), -1)
+
+    return background
+
+def render_scene(random, width=800, height=600):
+    '''
+    Render scene with one plate under random perspective, blur and noise.
+    Return gray image, plate text and corners of plate clockwise from top
+    left.
+    '''
+
+    text = random_plate_text(random)
+    plate = render_plate(text)
+    background = render_background(random, width, height)
+
+    # Place plate and displace its corners to simulate perspective.
+    plate_width = int(random.randint(*PLATE_WIDTHS))
+    plate_height = plate_width * PLATE_HEIGHT / PLATE_WIDTH
+    x = random.randint(plate_width / 4, width - plate_width * 5 / 4)
+    y = random.randint(plate_height, height - plate_height * 2)
+    corners = np.float32([[x, y], [x + plate_width, y], [x + plate_width, y + plate_height], [x, y + plate_height]])
+    corners += random.uniform(-PERSPECTIVE, PERSPECTIVE, corners.shape).astype(np.float32) * plate_width
+
+    source = np.float32([[0, 0], [PLATE_WIDTH, 0], [PLATE_WIDTH, PLATE_HEIGHT], [0, PLATE_HEIGHT]])
+    transform = cv2.getPerspectiveTransform(source, corners)
+    warped = cv2.warpPerspective(plate, transform, (width, height))
+    mask = cv2.warpPerspective(np.ones(plate.shape, dtype=np.float32), transform, (width, height))
+    scene = background * (1 - mask) + warped * mask
+
+    sigma = random.uniform(*BLUR_SIGMAS)
+
+    if sigma > 0.3:
+        scene = cv2.GaussianBlur(scene, (0, 0), sigma)
+
+    scene += random.normal(0, random.uniform(*NOISE_SIGMAS), scene.shape)
+    scene = np.clip(scene, 0, 255).astype(np.uint8)
+
+    return scene, text, [(int(round(cx)), int(round(cy))) for cx, cy in corners]
+
+def generate_scenes(count, seed=0, width=800, height=600):
+    '''
+    Generate count scenes encoded as JPEG. Same seed generates same scenes.
+    Return list of (encoded bytes, plate text, corners).
+    '''
+
+    random = np.random.RandomState(seed)
+    scenes = []
+
+    for _ in range(count):
+        scene, text, corners = render_scene(random, width, height)
+        quality = int(random.randint(*JPEG_QUALITIES))
+        _, encoded = cv2.imencode(".jpg", scene, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        scenes.append((encoded.tostring(), text, corners))
+
+    return scenes
+
+def write_scenes(directory, count, seed=0):
+    '''
+    Write scenes as JPEG files with plate annotations in the format read by
+    ConfigData.
+    '''
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    for index, (encoded, text, corners) in enumerate(generate_scenes(count, seed)):
+        image_path = os.path.join(directory, "synthetic_%05d.jpg" % index)
+
+        with open(image_path, "wb") as image_file:
+            image_file.write(encoded)
+
+        quadrilaterals = Quadrilaterals()
+        quadrilateral = quadrilaterals.add_quadrilateral()
+
+        for corner_x, corner_y in corners:
+            quadrilateral.add_point(Point(corner_x, corner_y))
+
+        config_data = ConfigData(quadrilaterals, image_path)
+        config_data.license_plates = [text]
+        config_data.save_file(quadrilaterals)
+
+
+if __name__ == '__main__':
+    '''
+    Write synthetic scenes with annotated plates.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Write synthetic scenes with annotated plates.')
+    arg_parser.add_argument('directory', help='Output directory')
+    arg_parser.add_argument('-n', '--count', dest='count', type=int, default=100, help='Number of scenes')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=0, help='Random seed')
+    args = vars(arg_parser.parse_args())
+
+    write_scenes(args['directory'], args['count'], args['seed'])
@@ -0,0 +1,80 @@
+from argparse import ArgumentParser
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import generate_scenes
+from models.image_loader import load_image
+from models.point import Point
+from models.quadrilateral import Quadrilateral
+from plate_tracker import PlateTracker
+from recognition_pipeline import load_pipeline
+
+
+def get_quadrilateral(corners):
+    '''
+    Get quadrilateral of plate corners.
+    '''
+
+    quadrilateral = Quadrilateral()
+
+    for corner_x, corner_y in corners:
+        quadrilateral.add_point(Point(corner_x, corner_y))
+
+    return quadrilateral
+
+def measure(detect, *args):
+    '''
+    Detect license plate and return it with time spent.
+    '''
+
+    start = time.time()
+    license_plate = detect(*args)
+
+    return license_plate, time.time() - start
+
+
+if __name__ == '__main__':
+    '''
+    Compare full frame detection with detection in region around plate, as
+    done by plate tracker for frames after the first one.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Compare full frame detection with tracked region detection.')
+    arg_parser.add_argument('-n', '--count', dest='count', type=int, default=100, help='Number of synthetic scenes')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=0, help='Random seed of synthetic scenes')
+    arg_parser.add_argument('--padding', dest='padding', type=float, default=0.5, help='Padding of region, as fraction of plate size')
+    args = vars(arg_parser.parse_args())
+
+    pipeline = load_pipeline()
+    pipeline.warmup()
+    detector = pipeline.detector
+    tracker = PlateTracker(detector, padding=args['padding'])
+    resize_width = detector.profile.resize_width
+    full_times = []
+    region_times = []
+    full_found = 0
+    region_found = 0
+
+    for encoded, _, corners in generate_scenes(args['count'], args['seed']):
+        full_plate, full_time = measure(detector.detect_license_plate, load_image(buffer=encoded, detection_width=resize_width))
+
+        # Region around annotated plate, as tracked from previous frame.
+        image = load_image(buffer=encoded, detection_width=resize_width)
+        tracker.region = tracker._get_region(get_quadrilateral(corners), image)
+
+        if tracker.region is None:
+            continue
+
+        region_plate, region_time = measure(tracker._detect_in_region, image)
+        full_times.append(full_time)
+        region_times.append(region_time)
+        full_found += int(full_plate is not None)
+        region_found += int(region_plate is not None)
+
+    if len(full_times) > 0:
+        print "Scenes: %d" % len(full_times)
+        print "Full frame: %.2f ms/frame, %d plates found" % (np.mean(full_times) * 1000, full_found)
+        print "Region:     %.2f ms/frame, %d plates found" % (np.mean(region_times) * 1000, region_found)
+        print "Speedup: %.2fx" % (np.mean(full_times) / np.mean(region_times))
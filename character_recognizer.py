@@ -4,14 +4,11 @@ Created on 08/07/2015
 @author: Alexandre Yukio Yamashita
          Flavio Nicastro
 '''
-from ConfigParser import SafeConfigParser
-from argparse import ArgumentParser
-from curses.ascii import isalpha
 import cv2
-from numpy.core.defchararray import isdigit
 
 from models.image import Image
-from models.logger import Logger
+from models.image_buffers import can_use_buffers, resize_into, invert_into, \
+    filter_gaussian_blur_into
 import numpy as np
 
 
@@ -25,13 +22,21 @@ class CharacterRecognizer:
         self.character_height = character_height
         self.classifier_type = classifier_type
         self.resize = 128
+        self.blur_size = 49
         
         if classifier_type == "knn":
             self.classifier = cv2.KNearest()
         else:
             self.classifier = cv2.SVM()
             
-        if self.classifier_type == "svm_linear_hog":                
+        self.hog = None
+    
+    def _get_hog(self):
+        '''
+        Get HOG descriptor, creating it if necessary.
+        '''
+        
+        if self.hog is None:
             winSize = (128,128)
             blockSize = (32,32)
             blockStride = (16,16)
@@ -46,11 +51,13 @@ class CharacterRecognizer:
             self.hog = cv2.HOGDescriptor(winSize,blockSize,blockStride,cellSize,nbins,derivAperture,winSigma,
                                     histogramNormType,L2HysThreshold,gammaCorrection,nlevels)
         
-    def _pre_process(self, image):
+        return self.hog
+        
+    def _pre_process(self, image, blur_size=None):
         if self.classifier_type == "svm_linear_hog":     
             image = image.resize(self.resize, self.resize)
             image.invert_binary()
-            image.filter_gaussian_blur(size=49)
+            image.filter_gaussian_blur(size=blur_size or self.blur_size)
             #image.plot()
         else:
             image = image.resize(self.character_width, self.character_height)
@@ -71,7 +78,7 @@ class CharacterRecognizer:
             image = self._pre_process(image)
             
             if self.classifier_type == "svm_linear_hog":                
-                hog_feature = self.hog.compute(image.data)
+                hog_feature = self._get_hog().compute(image.data)
                 binaries.append(hog_feature)
             else:
                 binaries.append(image.resize(self.character_width, self.character_height))
@@ -110,20 +117,59 @@ class CharacterRecognizer:
             self.samples = np.loadtxt(path_images, np.float32)
             self.labels = np.loadtxt(path_labels, np.float32)
             self.classifier.train(self.samples, self.labels)
+    
+    def load_bundle(self, bundle, name):
+        '''
+        Load configuration from model bundle. Name is "letter" or "number".
+        '''
+        
+        if self.classifier_type != "knn":
+            self.classifier.load(bundle.file_path(name + "_classifier"))
+        else:
+            self.samples = bundle.array(name + "_knn_images")
+            self.labels = bundle.array(name + "_knn_labels")
+            self.classifier.train(self.samples, self.labels)
             
-    def predict(self, sample, is_letter=False):
+    def _compute_features(self, sample, blur_size=None):
         '''
-        Predict sample label.
+        Compute features of sample used by classifier. If blur size is not
+        given, blur size of recognizer is used.
         '''
         
+        if can_use_buffers(sample.data):
+            return self._compute_features_using_buffers(sample.data, blur_size)
+        
         image = Image(image=sample.data)
-        image = self._pre_process(image)
+        image = self._pre_process(image, blur_size)
+        
+        if self.classifier_type == "svm_linear_hog":
+            image = self._get_hog().compute(image.data)
+            return np.array(image.flatten(), dtype=np.float32)
+        else:
+            return np.array(image.data.flatten(), dtype=np.float32)
+            
+    def _compute_features_using_buffers(self, data, blur_size=None):
+        '''
+        Compute features as _compute_features does, reusing buffers of thread
+        for intermediate images.
+        '''
         
         if self.classifier_type == "svm_linear_hog":
-            image = self.hog.compute(image.data)
-            image = np.array(image.flatten(), dtype=np.float32)
+            data = resize_into(data, self.resize, self.resize, "character_resized")
+            data = invert_into(data, "character_inverted")
+            data = filter_gaussian_blur_into(data, blur_size or self.blur_size, "character_blurred")
+            return np.array(self._get_hog().compute(data).flatten(), dtype=np.float32)
         else:
-            image = np.array(image.data.flatten(), dtype=np.float32)
+            data = resize_into(data, self.character_width, self.character_height, "character_resized")
+            data = invert_into(data, "character_inverted")
+            return np.array(data.flatten(), dtype=np.float32)
+            
+    def predict(self, sample, is_letter=False):
+        '''
+        Predict sample label.
+        '''
+        
+        image = self._compute_features(sample)
         
         if self.classifier_type != "knn":
             label = self.classifier.predict(image)
@@ -135,6 +181,25 @@ class CharacterRecognizer:
         
         return label    
     
+    def predict_batch(self, samples, blur_size=None):
+        '''
+        Predict labels of many samples in one classifier call. If blur size is
+        not given, blur size of recognizer is used.
+        '''
+        
+        if len(samples) == 0:
+            return []
+        
+        features = np.array([self._compute_features(sample, blur_size) for sample in samples])
+        
+        if self.classifier_type != "knn":
+            labels = self.classifier.predict_all(features).ravel()
+        else:
+            _, results, _, _ = self.classifier.find_nearest(features, k = 1)
+            labels = results[:, 0]
+            
+        return [chr(int(label)) for label in labels]
+    
     def save(self, trained_classifier_file, path_images="", path_labels=""):
         '''
         Save configuration.
@@ -150,6 +215,13 @@ if __name__ == '__main__':
     Train letter and number recognizers.
     '''
     
+    from ConfigParser import SafeConfigParser
+    from argparse import ArgumentParser
+    from curses.ascii import isalpha
+    from numpy.core.defchararray import isdigit
+    
+    from models.logger import Logger
+    
     # Parses args.
     arg_parser = ArgumentParser(description='Train character recognizer.')
     arg_parser.add_argument('-c', '--config', dest='config_file', default='config.ini', help='Configuration file')
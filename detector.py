@@ -4,18 +4,23 @@ Created on 26/06/2015
 @author: Alexandre Yukio Yamashita
          Flavio Nicastro
 '''
-from ConfigParser import SafeConfigParser
-from argparse import ArgumentParser
+import os
+
 import cv2
 
 from detector_haar import DetectorHaar
 from detector_svm import SVM
-from models import character_validator
 from models.character_validator import CharacterValidator
 from models.filter_license_plate import FilterLicensePlate
+from models.frame_cache import FrameCache, attach_frame_cache, get_frame_cache
 from models.image import Image
+from models.image_loader import get_detection_source
+from models.instrumentation import instrumentation
 from models.license_plate_utils import reescale_license_plate, \
     get_license_plate_quadrilateral
+from models.rect_grid import remove_rects_equal_to
+from models.runtime_profile import RuntimeProfile
+import numpy as np
 
 
 class Detector:
@@ -29,63 +34,224 @@ class Detector:
     image_width = None
     image_height = None
     
-    def __init__(self, cascade_file, svm_hog_detector_file, svm_binary_detector_file, image_width, image_height):
-        self.cascade_classifier = DetectorHaar(cascade_file)
+    def __init__(self, cascade_file, svm_hog_detector_file, svm_binary_detector_file, image_width, image_height, \
+                 single_pass_cascade=False, candidate_top_k=10, early_stop_characters=7, threads=1, profile=None):
+        self.cascade_classifier = DetectorHaar(cascade_file, single_pass_cascade)
         self.svm_detector = SVM(svm_hog_detector_file, svm_binary_detector_file)
         self.image_width = image_width
         self.image_height = image_height
-        self.resize_width = 400
         
-    def detect_license_plate(self, image_original):
+        # Parameters of detections without profile.
+        if profile is None:
+            profile = RuntimeProfile(single_pass_cascade=single_pass_cascade, candidate_top_k=candidate_top_k, \
+                                     early_stop_characters=early_stop_characters)
+        
+        self.profile = profile
+        self.threads = threads
+        self.pool = None
+        self.pool_pid = None
+        self.frame_cache_hits = 0
+        self.frame_cache_misses = 0
+        
+    def _get_pool(self):
         '''
-        Detect license plate in image.
+        Get thread pool, creating it if necessary. Return None if detection
+        runs in one thread.
         '''
         
-        if image_original.data is None:
-            raise ValueError('Error to open image.')
+        if self.threads <= 1:
+            return None
         
-        # Convert image to gray.
-        image_original.convert_to_gray()
-         
-        # Reescale image to speed up detection and equalize image.
-        image_resized = image_original.resize(self.resize_width, self.resize_width * image_original.height / image_original.width)
+        # Threads do not survive fork, create pool again in child process.
+        if self.pool is None or self.pool_pid != os.getpid():
+            # Only needed with threads, keep them off default startup.
+            from multiprocessing import cpu_count
+            from multiprocessing.pool import ThreadPool
+            
+            self.pool = ThreadPool(self.threads)
+            self.pool_pid = os.getpid()
+            
+            # Split cores between pool threads and OpenCV internal threads,
+            # never using more OpenCV threads than set by worker processes.
+            cv2.setNumThreads(min(cv2.getNumThreads(), max(1, cpu_count() // self.threads)))
+        
+        return self.pool
+    
+    def close(self):
+        '''
+        Stop threads of pool, if there is one.
+        '''
+        
+        if self.pool is not None and self.pool_pid == os.getpid():
+            self.pool.close()
+            self.pool.join()
+        
+        self.pool = None
+        self.pool_pid = None
+        
+    def get_detection_image(self, image_original, profile=None):
+        '''
+        Get image used for detection.
+        '''
+        
+        profile = profile if profile is not None else self.profile
+        
+        with instrumentation.stage("resize"):
+            # Convert image to gray.
+            image_original.convert_to_gray()
+             
+            # Reescale image to speed up detection and equalize image.
+            width = profile.resize_width
+            height = profile.resize_width * image_original.height / image_original.width
+            frame_cache = get_frame_cache(image_original)
+            
+            if frame_cache is not None:
+                image_resized = Image(image=frame_cache.get(image_original.cache_key + (("resize", width, height),), \
+                                                            lambda: image_original.resize(width, height).data).copy())
+            else:
+                image_resized = image_original.resize(width, height)
         
         # Pre process image for detection.
-        image_for_detection = Image(image=image_resized.data)
-        image_for_detection.smart_equalize()
+        with instrumentation.stage("smart_equalize"):
+            image_for_detection = Image(image=image_resized.data)
+            image_for_detection.smart_equalize()
+        
+        return image_for_detection
+        
+    def detect_license_plate(self, image_original, profile=None):
+        '''
+        Detect license plate in image, using parameters of profile if it is
+        given, otherwise parameters of detector.
+        '''
+        
+        profile = profile if profile is not None else self.profile
+        
+        # Detect in reduced copy of image, if there is one.
+        detection_source = get_detection_source(image_original)
+        
+        if detection_source.data is None:
+            raise ValueError('Error to open image.')
+        
+        # Images derived from frame are shared by all stages.
+        frame_cache = FrameCache()
+        
+        if detection_source is image_original:
+            with instrumentation.stage("convert_to_gray"):
+                image_original.convert_to_gray()
+                
+            attach_frame_cache(image_original, frame_cache, ("frame",))
+        else:
+            attach_frame_cache(detection_source, frame_cache, ("reduced",))
         
-        # Find license_plates using cascade classifier.
-        self.license_plates = []
-        self.license_plates += self.cascade_classifier.detect_using_cascade_classifier(image_for_detection)
+        image_for_detection = self.get_detection_image(detection_source, profile)
+        pool = self._get_pool()
         
-        # Find license_plates using rectangles.
-        image_for_detection.filter_median(size=3)
-        image_for_detection.contrast()  # Increase contrast to improve rectangle detection.
-        self.license_plates += image_for_detection.compute_rectangles_for_plates()
+        # Find license_plates using cascade classifier, in pool threads while
+        # rectangles are searched.
+        if pool is not None:
+            wait_cascade = self.cascade_classifier.start_detection(Image(image=image_for_detection.data), pool, profile)
+        else:
+            with instrumentation.stage("cascade"):
+                cascade_license_plates = self.cascade_classifier.detect_using_cascade_classifier(image_for_detection, profile)
+        
+        # Find license_plates using rectangles. Image is filtered even if
+        # rectangles are not searched, SVM classifies candidates in it.
+        with instrumentation.stage("rectangles"):
+            image_for_detection.filter_median(size=3)
+            image_for_detection.contrast()  # Increase contrast to improve rectangle detection.
+            
+            if profile.contour_rectangles:
+                rectangle_license_plates = image_for_detection.compute_rectangles_for_plates()
+            else:
+                rectangle_license_plates = []
+        
+        if pool is not None:
+            # Only time not overlapped with rectangle search is measured.
+            with instrumentation.stage("cascade"):
+                cascade_license_plates = wait_cascade()
+        
+        # Remove contour rectangles already found by cascade classifier.
+        license_plates = cascade_license_plates + remove_rects_equal_to(rectangle_license_plates, cascade_license_plates)
+        instrumentation.count("cascade_candidates", len(cascade_license_plates))
+        instrumentation.count("rectangle_candidates", len(rectangle_license_plates))
+        instrumentation.count("svm_candidates_in", len(license_plates))
         
         # Filter misclassified license plates using SVM.
         lp_filter = FilterLicensePlate()
-        self.license_plates = lp_filter.filter_using_svm(self.license_plates, image_for_detection, self.svm_detector, self.image_width, self.image_height)
+        
+        with instrumentation.stage("svm_filter"):
+            license_plates = lp_filter.filter_using_svm(license_plates, image_for_detection, self.svm_detector, self.image_width, self.image_height, \
+                                                        pool, profile.median_retry)
+        
+        instrumentation.count("svm_candidates_out", len(license_plates))
+        
+        # When there are too many candidates, extract characters only of the
+        # ones with greatest SVM margins, stopping at first complete plate.
+        early_stop_characters = None
+        
+        if profile.candidate_top_k is not None and len(license_plates) > profile.candidate_top_k:
+            license_plates = lp_filter.prune_license_plates(license_plates, profile.candidate_top_k)
+            early_stop_characters = profile.early_stop_characters
+            instrumentation.count("pruned_candidates_out", len(license_plates))
+        
+        if len(license_plates) == 0:
+            # Full resolution image is not needed.
+            self.license_plates = license_plates
+            self._finish_frame(frame_cache, image_original)
+            return None
+        
+        if detection_source is not image_original:
+            # Full resolution is only cropped around license plates found.
+            image_original.convert_to_gray()
+            attach_frame_cache(image_original, frame_cache, ("frame",))
         
         # Reescale license plates to original size.
-        total_license_plates = range(len(self.license_plates))
+        total_license_plates = range(len(license_plates))
         for index in total_license_plates:
-            self.license_plates[index] = reescale_license_plate(self.license_plates[index], \
-                                                                image_original.width, self.resize_width)
+            license_plates[index] = reescale_license_plate(license_plates[index], \
+                                                           image_original.width, profile.resize_width)
+            license_plates[index].ransac_iterations = profile.ransac_iterations
         
         # Get best license plate found, computing character positions.
-        best_license_plate = lp_filter.get_best_license_plate(self.license_plates, image_original)
+        with instrumentation.stage("best_license_plate"):
+            best_license_plate = lp_filter.get_best_license_plate(license_plates, image_original, \
+                                                                  early_stop_characters=early_stop_characters, pool=pool, \
+                                                                  threads=self.threads)
         
         if best_license_plate is not None:
             # Adjust size of characters and predict the position of unrecognized characters.
-            character_validator = CharacterValidator()
-            best_license_plate = character_validator.adjust_characters(best_license_plate, image_original, self.resize_width)
+            with instrumentation.stage("adjust_characters"):
+                character_validator = CharacterValidator(profile.max_recrops)
+                best_license_plate = character_validator.adjust_characters(best_license_plate, image_original, profile.resize_width)
+                
             best_license_plate = get_license_plate_quadrilateral(best_license_plate)
+            best_license_plate.character_blur_size = profile.character_blur_size
             self.license_plates = [best_license_plate]
         else:
             self.license_plates = []
+        
+        self._finish_frame(frame_cache, image_original)
             
-        return best_license_plate    
+        return best_license_plate
+    
+    def _finish_frame(self, frame_cache, image_original):
+        '''
+        Count images reused in frame and release them.
+        '''
+        
+        self.frame_cache_hits += frame_cache.hits
+        self.frame_cache_misses += frame_cache.misses
+        frame_cache.clear()
+        image_original.frame_cache = None    
+    
+    def warmup(self):
+        '''
+        Run detection in a blank image, so first request has no extra latency.
+        '''
+        
+        resize_width = self.profile.resize_width
+        self.detect_license_plate(Image(image=np.zeros((resize_width / 2, resize_width), dtype=np.uint8)))
+        self.license_plates = None
     
     def plot(self, image):
         '''
@@ -99,7 +265,7 @@ class Detector:
             for license_plate in self.license_plates:
                 cv2.rectangle(image.data, (license_plate.x, license_plate.y), (license_plate.x + license_plate.w, license_plate.y + license_plate.h), (255, 0, 0), 2)
         
-        image = image.resize(self.resize_width, self.resize_width * image.height / image.width)
+        image = image.resize(self.profile.resize_width, self.profile.resize_width * image.height / image.width)
         image.plot()        
     
     def plot_quadrilateral(self, image):
@@ -122,7 +288,7 @@ class Detector:
             cv2.line(image.data, (point3.x, point3.y), (point4.x, point4.y), (255, 0, 0), 4)
             cv2.line(image.data, (point4.x, point4.y), (point1.x, point1.y), (255, 0, 0), 4)
             
-        image = image.resize(self.resize_width, self.resize_width * image.height / image.width)
+        image = image.resize(self.profile.resize_width, self.profile.resize_width * image.height / image.width)
         image.plot()       
         
 if __name__ == '__main__':   
@@ -130,6 +296,9 @@ if __name__ == '__main__':
     Detect license plate in image.
     '''
     
+    from ConfigParser import SafeConfigParser
+    from argparse import ArgumentParser
+    
     # Parses args.
     arg_parser = ArgumentParser(description='Detect license plate.')
     arg_parser.add_argument('-c', '--config', dest='config_file', default='config.ini', help='Configuration file')
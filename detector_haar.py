@@ -3,9 +3,12 @@ Created on 06/07/2015
 
 @author: Alexandre Yukio Yamashita
 '''
+import threading
+
 import cv2
 
 from models.rect import Rect
+from models.rect_grid import RectGrid, remove_equal_rects
 
 
 class DetectorHaar:
@@ -15,8 +18,16 @@ class DetectorHaar:
     
     cascade_classifier = None
     
-    def __init__(self, cascade_file):
+    def __init__(self, cascade_file, single_pass=False):
+        self.cascade_file = cascade_file
         self.cascade_classifier = cv2.CascadeClassifier(cascade_file)
+        self.main_thread = threading.current_thread()
+        self.local = threading.local()
+        self.single_pass_cascade = single_pass
+        self.scale_factors = [float(i) / 10 for i in range(11, 15)]
+        self.neighbors = range(2, 5)
+        self.min_size = (8, 16)
+        self.merge_distance = 5
     
     def _to_rects(self, cv_results):
         '''
@@ -24,16 +35,114 @@ class DetectorHaar:
         '''
         return [Rect(result) for result in cv_results]
     
-    def detect_using_cascade_classifier(self, image):
+    def _get_cascade_classifier(self):
+        '''
+        Get cascade classifier of current thread. Threads of pool use their own
+        copy of classifier.
+        '''
+        
+        if threading.current_thread() is self.main_thread:
+            return self.cascade_classifier
+        
+        if getattr(self.local, "cascade_classifier", None) is None:
+            self.local.cascade_classifier = cv2.CascadeClassifier(self.cascade_file)
+        
+        return self.local.cascade_classifier
+    
+    def _get_settings(self, profile=None):
+        '''
+        Get cascade settings of detection: scale factors, neighbors, minimum
+        size and single pass. Without profile, settings of detector are used.
+        '''
+        
+        return profile if profile is not None else self
+    
+    def _get_passes(self, settings):
+        '''
+        Get scale factor and neighbors threshold of each pass.
+        '''
+        return [(scale, neighbors) for scale in settings.scale_factors for neighbors in settings.neighbors]
+    
+    def _detect_pass(self, image, scale, neighbors, min_size):
+        '''
+        Scan image with scale factor and neighbors threshold.
+        '''
+        return self._to_rects(self._get_cascade_classifier().detectMultiScale(image.data, scaleFactor=scale, minNeighbors=neighbors, \
+                                                                              minSize=min_size, flags=cv2.cv.CV_HAAR_SCALE_IMAGE))
+    
+    def _detect_multiple_passes(self, image, settings):
+        '''
+        Scan image once for each scale factor and neighbors threshold.
+        '''
+        license_plates = []
+        
+        for scale, neighbors in self._get_passes(settings):
+            license_plates.extend(self._detect_pass(image, scale, neighbors, settings.min_size))
+        
+        return license_plates
+    
+    def _detect_single_pass(self, image, settings):
+        '''
+        Scan image once at finest scale factor keeping raw detections, then
+        group them for each neighbors threshold. Grouping is the same done by
+        detectMultiScale with minNeighbors, so results are the same of the
+        passes with finest scale factor.
         '''
-        Detect license plates using cascade classifier.
-        '''        
         license_plates = []
         
-        for scale in [float(i) / 10 for i in range(11, 15)]:
-            for neighbors in range(2, 5):
-                license_plates.extend(self._to_rects(self.cascade_classifier.detectMultiScale(image.data, scaleFactor=scale, minNeighbors=neighbors, \
-                                                     minSize=(8, 16), flags=cv2.cv.CV_HAAR_SCALE_IMAGE)))
+        # With minNeighbors = 0 detections are not grouped.
+        detections = self._get_cascade_classifier().detectMultiScale(image.data, scaleFactor=min(settings.scale_factors), minNeighbors=0, \
+                                                              minSize=settings.min_size, flags=cv2.cv.CV_HAAR_SCALE_IMAGE)
+        
+        if len(detections) == 0:
+            return license_plates
+        
+        detections = [list(detection) for detection in detections]
+        
+        for neighbors in settings.neighbors:
+            grouped, _ = cv2.groupRectangles(list(detections), neighbors, 0.2)
+            
+            for result in grouped:
+                license_plates.append(Rect(result))
+        
+        return license_plates
+    
+    def detect_using_cascade_classifier(self, image, profile=None):
+        '''
+        Detect license plates using cascade classifier, with cascade settings
+        of profile if it is given.
+        '''        
+        
+        settings = self._get_settings(profile)
+        
+        if settings.single_pass_cascade:
+            license_plates = self._detect_single_pass(image, settings)
+        else:
+            license_plates = self._detect_multiple_passes(image, settings)
+        
+        return self._merge_detections(license_plates)
+    
+    def start_detection(self, image, pool, profile=None):
+        '''
+        Start detection of license plates in threads of pool, running passes
+        concurrently. Return function that waits for detected license plates.
+        '''
+        
+        settings = self._get_settings(profile)
+        
+        if settings.single_pass_cascade:
+            result = pool.apply_async(self._detect_single_pass, (image, settings))
+            return lambda: self._merge_detections(result.get())
+        
+        # Results are merged in order of passes, as in sequential detection.
+        results = [pool.apply_async(self._detect_pass, (image, scale, neighbors, settings.min_size)) \
+                   for scale, neighbors in self._get_passes(settings)]
+        return lambda: self._merge_detections([license_plate for result in results for license_plate in result.get()])
+    
+    def _merge_detections(self, license_plates):
+        '''
+        Merge detected license plates.
+        '''
         
         if len(license_plates) > 0:
             license_plates = self._merge_license_plates(license_plates)
@@ -46,40 +155,46 @@ class DetectorHaar:
         '''
         Merge license plates.
         '''
-        input_license_plates = license_plates
-        license_plates = []
-          
-        # if the sizes of these license plates are within .5% of each other, take the
-        # one nearest midpoint
-        for current_license_plate in input_license_plates:
-            new_license_plate = current_license_plate
-            
-            # Merge license plates.
-            for license_plate in input_license_plates:
-                if license_plate.intersect(new_license_plate) and abs(new_license_plate.x - license_plate.x) < 5 and abs(new_license_plate.y - license_plate.y) < 5:
-                    x_max = max(license_plate.x + license_plate.w, new_license_plate.x + new_license_plate.w)
-                    y_max = max(license_plate.y + license_plate.h, new_license_plate.y + new_license_plate.h)
-                     
-                    x_min = min(license_plate.x, new_license_plate.x)
-                    y_min = min(license_plate.y, new_license_plate.y)
-                      
-                    width = x_max - x_min
-                    height = y_max - y_min
-                      
-                    new_license_plate.x = x_min
-                    new_license_plate.y = y_min
-                    new_license_plate.w = width
-                    new_license_plate.h = height
-            
-            # Avoid adding twice the same rectangle.
-            exists = False
+        
+        # Index license plates by position, so each one is compared only with
+        # license plates less than 5 pixels apart.
+        grid = RectGrid(self.merge_distance)
+        
+        for index, license_plate in enumerate(license_plates):
+            grid.add(index, license_plate)
+        
+        for index, new_license_plate in enumerate(license_plates):
+            last_index = -1
             
-            for license_plate in license_plates:    
-                if license_plate.equal(new_license_plate):
-                    exists = True
-                    break
+            # Merge license plates in input order, as merged license plate grows.
+            while True:
+                candidates = sorted(candidate for candidate in grid.near(new_license_plate.x, new_license_plate.y, self.merge_distance) \
+                                    if candidate > last_index and candidate != index)
+                merged = False
                 
-            if not exists:
-                license_plates.append(new_license_plate)
+                for candidate in candidates:
+                    license_plate = license_plates[candidate]
+                    
+                    if license_plate.intersect(new_license_plate) and abs(new_license_plate.x - license_plate.x) < self.merge_distance \
+                       and abs(new_license_plate.y - license_plate.y) < self.merge_distance:
+                        x_max = max(license_plate.x + license_plate.w, new_license_plate.x + new_license_plate.w)
+                        y_max = max(license_plate.y + license_plate.h, new_license_plate.y + new_license_plate.h)
+                        
+                        x_min = min(license_plate.x, new_license_plate.x)
+                        y_min = min(license_plate.y, new_license_plate.y)
+                        
+                        new_license_plate.x = x_min
+                        new_license_plate.y = y_min
+                        new_license_plate.w = x_max - x_min
+                        new_license_plate.h = y_max - y_min
+                        grid.move(index, new_license_plate)
+                        
+                        last_index = candidate
+                        merged = True
+                        break
+                
+                if not merged:
+                    break
         
-        return license_plates
+        # Avoid adding twice the same rectangle.
+        return remove_equal_rects(license_plates, self.merge_distance)
@@ -4,18 +4,44 @@ Created on 02/07/2015
 @author: Alexandre Yukio Yamashita
          Flavio Nicastro
 '''
-from ConfigParser import SafeConfigParser
-from argparse import ArgumentParser
+import xml.etree.cElementTree as ElementTree
+
 import cv2
 
-from models import logger
-from models.files import Files
-from models.image import Image
-from models.logger import Logger
-from models.point import Point
+from models.image_buffers import can_use_buffers, resize_into
 import numpy as np
 
 
+def read_linear_svm(file_path):
+    '''
+    Read weights and rho of two class linear SVM saved by OpenCV, whose
+    decision function is the dot product with weights minus rho. Return None
+    if SVM is not linear or file cannot be read.
+    '''
+    
+    try:
+        svm = ElementTree.parse(file_path).getroot()[0]
+    except (IOError, SyntaxError, IndexError):
+        return None
+    
+    if (svm.findtext("kernel/type") or "").strip() != "LINEAR" or (svm.findtext("class_count") or "").strip() != "2":
+        return None
+    
+    support_vectors = [np.array(node.text.split(), dtype=np.float32) for node in svm.find("support_vectors")]
+    decision_function = svm.find("decision_functions")[0]
+    alphas = [float(alpha) for alpha in decision_function.findtext("alpha").split()]
+    indexes = decision_function.findtext("index")
+    indexes = [int(index) for index in indexes.split()] if indexes is not None else range(len(alphas))
+    
+    # Linear kernel of support vectors is merged in one weight vector.
+    weights = np.zeros(len(support_vectors[0]), dtype=np.float32)
+    
+    for alpha, index in zip(alphas, indexes):
+        weights += alpha * support_vectors[index]
+    
+    return weights, float(decision_function.findtext("rho"))
+
+
 class SVM:
     '''
     SVM classifier based on HOG descriptor and binary image.
@@ -30,10 +56,33 @@ class SVM:
         self.trained_binary_file = trained_binary_file
         self.svm_hog = cv2.SVM()
         #self.svm_binary = cv2.SVM()
+        self.hog = None
+        self.linear_svm = None
         
         if trained_hog_file is not None and trained_binary_file is not None:
             self.load(trained_hog_file, trained_binary_file)
                 
+    def _get_hog(self):
+        '''
+        Get HOG descriptor, creating it if necessary.
+        '''
+        
+        if self.hog is None:
+            self.hog = cv2.HOGDescriptor()
+        
+        return self.hog
+    
+    def _compute_features(self, sample):
+        '''
+        Compute HOG features of sample.
+        '''
+        
+        # Resize into buffer reused by all samples of thread.
+        if can_use_buffers(sample.data):
+            return self._get_hog().compute(resize_into(sample.data, 256, 128, "svm_hog"))
+        
+        return self._get_hog().compute(sample.resize(256, 128).data)
+                
     def train(self, samples, responses):
         '''
         Train SVM classifier.
@@ -56,12 +105,12 @@ class SVM:
 #         binaries = np.array([np.array(image.data.flatten(), dtype=np.float32) for image in binaries])
 #         
         # Convert data to numpy.
-        hog = cv2.HOGDescriptor()
-        samples = np.array([hog.compute(image.resize(256, 128).data) for image in samples])
+        samples = np.array([self._compute_features(image) for image in samples])
         responses = np.array(responses)
         
         # Train SVM.
         self.svm_hog.train(samples, responses, params=params)
+        self.linear_svm = None
         #self.svm_binary.train(binaries, responses, params=params)
 
     def predict(self, sample):
@@ -76,17 +125,51 @@ class SVM:
 #         binary_detected = self.svm_binary.predict(image)
         binary_detected = True
             
-        hog = cv2.HOGDescriptor()
-        sample = hog.compute(sample.resize(256, 128).data)
+        sample = self._compute_features(sample)
         hog_detected = self.svm_hog.predict(sample)
     
         return binary_detected and hog_detected
     
+    def predict_batch(self, samples, return_scores=False, pool=None):
+        '''
+        Predict labels of many samples in one classifier call. If return_scores
+        is True, also return decision function margins, positive for license
+        plates. If pool is given, features are computed concurrently.
+        '''
+        
+        if len(samples) == 0:
+            return ([], []) if return_scores else []
+        
+        if pool is not None:
+            features = pool.map(lambda sample: self._compute_features(sample).ravel(), samples)
+        else:
+            features = [self._compute_features(sample).ravel() for sample in samples]
+        
+        features = np.array(features, dtype=np.float32)
+        labels = list(self.svm_hog.predict_all(features).ravel())
+        
+        if not return_scores:
+            return labels
+        
+        # Compute decision function of all samples at once if SVM is linear.
+        if self.linear_svm is not None:
+            weights, rho = self.linear_svm
+            decision_values = np.abs(features.dot(weights) - rho)
+        else:
+            decision_values = [abs(float(self.svm_hog.predict(feature, returnDFVal=True))) for feature in features]
+        
+        # Sign of decision function depends on order of class labels, use
+        # predicted label to orient margins.
+        margins = [float(value) if label > 0 else -float(value) for value, label in zip(decision_values, labels)]
+        
+        return labels, margins
+    
     def load(self, trained_hog_file, trained_binary_file):
         '''
         Load configuration from file.
         '''
         self.svm_hog.load(trained_hog_file)
+        self.linear_svm = read_linear_svm(trained_hog_file)
         #self.svm_binary.load(trained_binary_file)
     
     def save(self, trained_hog_file, trained_binary_file):
@@ -103,6 +186,14 @@ if __name__ == '__main__':
     Train SVM detector.
     '''
     
+    from ConfigParser import SafeConfigParser
+    from argparse import ArgumentParser
+    
+    from models.files import Files
+    from models.image import Image
+    from models.logger import Logger
+    from models.point import Point
+    
     # Parses args.
     arg_parser = ArgumentParser(description='Train SVM detector.')
     arg_parser.add_argument('-c', '--config', dest='config_file', default='config.ini', help='Configuration file')
@@ -0,0 +1,320 @@
+from argparse import ArgumentParser
+import csv
+import json
+from multiprocessing import Pool, cpu_count
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+
+# Pipeline loaded by parent process before forking workers.
+_pipeline = None
+
+CSV_FIELDS = ["image", "expected", "plate", "correct_characters", "total_characters", "correct_plate", "latency_ms", \
+              "result", "error"]
+
+
+def _initialize_worker():
+    '''
+    Initialize worker process.
+    '''
+
+    # Each worker uses one core, avoid oversubscription by OpenCV threads
+    # and by threads of detector.
+    cv2.setNumThreads(1)
+    _pipeline.detector.threads = 1
+
+def _evaluate(image_path):
+    '''
+    Recognize license plate in worker process and compare it with annotation.
+    '''
+
+    start = time.time()
+
+    try:
+        result = _pipeline.recognize_path(image_path)
+        latency = time.time() - start
+
+        return compare_result(image_path, result, read_expected_plate(image_path), latency)
+    except Exception as error:
+        # A failing image must not stop evaluation of the other images.
+        return get_error_row(image_path, error, time.time() - start)
+
+def read_expected_plate(image_path):
+    '''
+    Read plate annotated for image, or "" if image has no annotation.
+    '''
+
+    from models.config_data import ConfigData
+    from models.quadrilaterals import Quadrilaterals
+
+    config_data = ConfigData(Quadrilaterals(), image_path)
+    config_data.read_data()
+
+    return config_data.license_plates_text
+
+def get_image_signature(image_path):
+    '''
+    Get size and modification time of image and of its annotation.
+    '''
+
+    signature = []
+
+    for path in [image_path, os.path.splitext(image_path)[0] + ".txt"]:
+        if os.path.isfile(path):
+            status = os.stat(path)
+            signature.append("%d:%d" % (status.st_size, int(status.st_mtime)))
+        else:
+            signature.append("")
+
+    return ",".join(signature)
+
+def compare_result(image_path, result, expected, latency):
+    '''
+    Compare lpdetect result line with expected plate. Characters are only
+    compared when both plates have seven characters.
+    '''
+
+    plate = result.rsplit(",", 1)[-1] if "," in result else ""
+    correct_characters = 0
+    total_characters = 0
+
+    if len(expected) == 7 and len(plate) == 7:
+        total_characters = 7
+        correct_characters = sum([1 for index in range(7) if plate[index].lower() == expected[index].lower()])
+
+    return {"image": image_path, "expected": expected, "plate": plate, "result": result, \
+            "correct_characters": correct_characters, "total_characters": total_characters, \
+            "correct_plate": int(len(expected) > 0 and plate.lower() == expected.lower()), \
+            "latency_ms": latency * 1000}
+
+def get_error_row(image_path, error, latency):
+    '''
+    Get row of image whose recognition failed, counted as a wrong plate.
+    '''
+
+    from recognition_pipeline import RECOGNITION_ERROR
+
+    return {"image": image_path, "expected": "", "plate": "", "result": RECOGNITION_ERROR, \
+            "correct_characters": 0, "total_characters": 0, "correct_plate": 0, \
+            "latency_ms": latency * 1000, "error": "%s: %s" % (type(error).__name__, error)}
+
+def read_previous_rows(jsonl_path, fingerprint, profile_fingerprint=None):
+    '''
+    Read rows of previous evaluation computed with models of fingerprint
+    and runtime profile of profile fingerprint, indexed by image path. Last
+    row of each image is kept. Rows of failed images are not kept, so they
+    are processed again.
+    '''
+
+    rows = {}
+
+    if jsonl_path is None or not os.path.isfile(jsonl_path):
+        return rows
+
+    with open(jsonl_path) as jsonl_file:
+        for line in jsonl_file:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # Line written partially by an interrupted run.
+                continue
+
+            if row.get("fingerprint") == fingerprint and row.get("profile") == profile_fingerprint:
+                if "error" in row:
+                    rows.pop(row["image"], None)
+                else:
+                    rows[row["image"]] = row
+
+    return rows
+
+
+class Evaluator:
+    '''
+    Evaluate accuracy and latency of pipeline on annotated images using a
+    pool of forked workers. Images with rows of a previous evaluation using
+    the same models and runtime profile are not processed again.
+    '''
+
+    def __init__(self, pipeline, workers=None, chunk_size=4):
+        self.pipeline = pipeline
+        self.workers = workers if workers is not None else cpu_count()
+        self.chunk_size = chunk_size
+        self.rows = []
+        self.reused_rows = 0
+        self.total_time = 0.0
+
+    def evaluate(self, image_paths, previous_rows=None):
+        '''
+        Evaluate images, yielding row of each image as soon as it is ready.
+        Rows reused from previous rows are yielded first.
+        '''
+
+        global _pipeline
+        _pipeline = self.pipeline
+
+        self.rows = []
+        self.reused_rows = 0
+        previous_rows = previous_rows if previous_rows is not None else {}
+        pending_paths = []
+
+        for image_path in image_paths:
+            row = previous_rows.get(image_path)
+
+            if row is not None and row.get("signature") == get_image_signature(image_path):
+                self.rows.append(row)
+                self.reused_rows += 1
+                yield row
+            else:
+                pending_paths.append(image_path)
+
+        start = time.time()
+
+        # Fork workers only after models are loaded.
+        pool = Pool(self.workers, _initialize_worker)
+
+        try:
+            for row in pool.imap_unordered(_evaluate, pending_paths, self.chunk_size):
+                row["fingerprint"] = self.pipeline.fingerprint
+                row["profile"] = self.pipeline.detector.profile.get_fingerprint()
+                row["signature"] = get_image_signature(row["image"])
+                self.rows.append(row)
+                yield row
+
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            self.total_time = time.time() - start
+
+    def summary(self):
+        '''
+        Get accuracy of characters and plates and latency percentiles of all
+        rows, and throughput of images processed in this run. Failed images
+        count as wrong plates.
+        '''
+
+        correct_characters = sum([row["correct_characters"] for row in self.rows])
+        total_characters = sum([row["total_characters"] for row in self.rows])
+        correct_plates = sum([row["correct_plate"] for row in self.rows])
+        latencies = [row["latency_ms"] for row in self.rows]
+        failures = sum([1 for row in self.rows if "error" in row])
+        processed = len(self.rows) - self.reused_rows
+
+        summary = {"images": len(self.rows), "reused": self.reused_rows, "failures": failures, \
+                   "character_accuracy": correct_characters * 1.0 / total_characters if total_characters > 0 else 0.0, \
+                   "plate_accuracy": correct_plates * 1.0 / len(self.rows) if len(self.rows) > 0 else 0.0, \
+                   "correct_characters": correct_characters, "total_characters": total_characters, \
+                   "correct_plates": correct_plates, \
+                   "images_per_second": processed / self.total_time if self.total_time > 0 and processed > 0 else 0.0}
+
+        if len(latencies) > 0:
+            for percentile in [50, 95, 99]:
+                summary["p%d_ms" % percentile] = float(np.percentile(latencies, percentile))
+
+            summary["mean_ms"] = float(np.mean(latencies))
+
+        return summary
+
+    def report(self, output_file=sys.stderr):
+        '''
+        Write accuracy, latency and throughput.
+        '''
+
+        summary = self.summary()
+        output_file.write("Images: %d (%d reused from previous run, %d failed)\n" % \
+                          (summary["images"], summary["reused"], summary["failures"]))
+        output_file.write("Character accuracy: %d/%d - %.2f%%\n" % \
+                          (summary["correct_characters"], summary["total_characters"], summary["character_accuracy"] * 100))
+        output_file.write("Plate accuracy: %d/%d - %.2f%%\n" % \
+                          (summary["correct_plates"], summary["images"], summary["plate_accuracy"] * 100))
+
+        if "p50_ms" in summary:
+            output_file.write("Latency: p50 %.1f ms, p95 %.1f ms, p99 %.1f ms\n" % \
+                              (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]))
+
+        output_file.write("Throughput: %.2f images/s with %d workers\n" % (summary["images_per_second"], self.workers))
+
+    def write_csv(self, csv_path):
+        '''
+        Write rows sorted by image path as CSV.
+        '''
+
+        with open(csv_path, "wb") as csv_file:
+            writer = csv.DictWriter(csv_file, CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+
+            for row in sorted(self.rows, key=lambda row: row["image"]):
+                writer.writerow(row)
+
+
+def evaluate_directory(pipeline, image_paths, jsonl_path=None, csv_path=None, workers=None, resume=True, \
+                       output_file=sys.stdout):
+    '''
+    Evaluate images, appending new rows to JSON lines file and writing all
+    rows to CSV file. Return evaluator.
+    '''
+
+    previous_rows = read_previous_rows(jsonl_path, pipeline.fingerprint, pipeline.detector.profile.get_fingerprint()) \
+                    if resume else {}
+    evaluator = Evaluator(pipeline, workers)
+    jsonl_file = open(jsonl_path, "a" if resume else "w") if jsonl_path else None
+
+    try:
+        for row in evaluator.evaluate(image_paths, previous_rows):
+            output_file.write(row["image"] + "\t" + row["result"] + "\t" + row["expected"] + "\n")
+
+            # Only rows computed in this run are appended.
+            if jsonl_file is not None and previous_rows.get(row["image"]) is not row:
+                jsonl_file.write(json.dumps(row, sort_keys=True) + "\n")
+                jsonl_file.flush()
+    finally:
+        if jsonl_file is not None:
+            jsonl_file.close()
+
+    if csv_path:
+        evaluator.write_csv(csv_path)
+
+    return evaluator
+
+
+if __name__ == '__main__':
+    '''
+    Evaluate accuracy and latency of license plate recognition on annotated
+    images using many processes.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Evaluate accuracy and latency of license plate recognition.')
+    arg_parser.add_argument('image_paths', nargs='*', help='Image paths, directories, or - to read paths from stdin')
+    arg_parser.add_argument('-c', '--config', dest='config_file', default='config.ini', help='Configuration file')
+    arg_parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=None, help='Number of worker processes')
+    arg_parser.add_argument('--jsonl', dest='jsonl_path', default='evaluation.jsonl', help='JSON lines file with row of each image')
+    arg_parser.add_argument('--csv', dest='csv_path', help='CSV file with row of each image')
+    arg_parser.add_argument('--no-resume', dest='resume', action='store_false', \
+                            help='Evaluate all images, ignoring rows of previous runs')
+    arg_parser.add_argument('--profile', dest='profile', help='Runtime profile, as fast, balanced or accurate')
+    args = vars(arg_parser.parse_args())
+
+    from lpdetect import get_image_paths
+    from recognition_pipeline import load_pipeline
+
+    image_arguments = args['image_paths']
+
+    if len(image_arguments) == 0:
+        # Use testing directory of configuration file.
+        from models.cached_config import read_config
+        image_arguments = [read_config(args['config_file'])['testing']['path_test']]
+
+    # Load models once in parent process, before forking workers.
+    pipeline = load_pipeline(config_file=args['config_file'], profile=args['profile'])
+    pipeline.warmup()
+
+    evaluator = evaluate_directory(pipeline, get_image_paths(image_arguments), args['jsonl_path'], args['csv_path'], \
+                                   args['jobs'], args['resume'])
+    evaluator.report()
@@ -7,7 +7,10 @@ Created on 15/07/2015
 from numpy.core.defchararray import isalpha, isdigit
 
 from character_recognizer import CharacterRecognizer
+from models.image import Image
+from models.instrumentation import instrumentation
 from models.point import Point
+import numpy as np
 
 
 class LicensePlateRecognizer:
@@ -20,45 +23,182 @@ class LicensePlateRecognizer:
                  path_number_knn_labels_classifier="classifier/number_knn_labels_classifier.xml",
                  path_number_knn_images_classifier="classifier/number_knn_images_classifier.xml",
                  path_letter_knn_labels_classifier="classifier/letter_knn_labels_classifier.xml",
-                 path_letter_knn_images_classifier="classifier/letter_knn_images_classifier.xml"):
-        self.letter_recognizer = CharacterRecognizer(character_width, character_height, classifier_type)
-        self.number_recognizer = CharacterRecognizer(character_width, character_height, classifier_type)
-        self.number_recognizer.load(path_number_classifier, path_number_knn_images_classifier, path_number_knn_labels_classifier)
-        self.letter_recognizer.load(path_letter_classifier, path_letter_knn_images_classifier, path_letter_knn_labels_classifier)
+                 path_letter_knn_images_classifier="classifier/letter_knn_images_classifier.xml",
+                 bundle=None):
+        self.character_width = character_width
+        self.character_height = character_height
+        self.classifier_type = classifier_type
+        self.bundle = bundle
         
+        # Classifier files used by each recognizer. Only files used by
+        # classifier type are read, when recognizer is used first time.
+        if classifier_type == "knn":
+            self.letter_files = ("", path_letter_knn_images_classifier, path_letter_knn_labels_classifier)
+            self.number_files = ("", path_number_knn_images_classifier, path_number_knn_labels_classifier)
+        else:
+            self.letter_files = (path_letter_classifier,)
+            self.number_files = (path_number_classifier,)
+        
+        self.letter_recognizer = None
+        self.number_recognizer = None
+        
+        # Blur size of character features, or None for default of recognizers.
+        self.character_blur_size = None
+    
+    def set_character_blur_size(self, blur_size):
+        '''
+        Set default blur size of character features, without loading
+        recognizers not loaded yet.
+        '''
+        
+        self.character_blur_size = blur_size
+        
+        for recognizer in [self.letter_recognizer, self.number_recognizer]:
+            if recognizer is not None:
+                recognizer.blur_size = blur_size
+    
+    def _load_recognizer(self, name, files):
+        '''
+        Create and load character recognizer. Name is "letter" or "number".
+        '''
+        
+        recognizer = CharacterRecognizer(self.character_width, self.character_height, self.classifier_type)
+        
+        if self.bundle is not None:
+            recognizer.load_bundle(self.bundle, name)
+        else:
+            recognizer.load(*files)
+        
+        if self.character_blur_size is not None:
+            recognizer.blur_size = self.character_blur_size
+            
+        return recognizer
+    
+    def get_letter_recognizer(self):
+        '''
+        Get letter recognizer, loading it if necessary.
+        '''
+        
+        if self.letter_recognizer is None:
+            self.letter_recognizer = self._load_recognizer("letter", self.letter_files)
+            
+        return self.letter_recognizer
+    
+    def get_number_recognizer(self):
+        '''
+        Get number recognizer, loading it if necessary.
+        '''
+        
+        if self.number_recognizer is None:
+            self.number_recognizer = self._load_recognizer("number", self.number_files)
+            
+        return self.number_recognizer
+    
+    def load(self):
+        '''
+        Load letter and number recognizers.
+        '''
+        
+        self.get_letter_recognizer()
+        self.get_number_recognizer()
+    
+    def warmup(self):
+        '''
+        Load recognizers and run a dummy prediction, so first request has no
+        extra latency.
+        '''
+        
+        character_image = Image(image=np.zeros((self.character_height * 4, self.character_width * 2), dtype=np.uint8))
+        self.get_letter_recognizer().predict(character_image, True)
+        self.get_number_recognizer().predict(character_image)
+        
+    def _crop_character(self, license_plate, index):
+        '''
+        Crop character image, returning None if character is out of image.
+        '''
+        
+        character = license_plate.subrects[index]
+        character_image = license_plate.image.crop(Point(character.x, character.y), Point(character.x + character.w - 1, character.y + character.h - 1))
+        
+        if character_image.data.size > 0 and character_image.data is not None:
+            return character_image
+        
+        return None
+    
     def predict(self, license_plate):
-        plate = ""
+        '''
+        Predict plate of license plate.
+        '''
+        
+        return self.predict_batch([license_plate])[0]
+    
+    def _predict_characters(self, recognizer, characters, license_plates):
+        '''
+        Predict characters of license plates, in one call for each character
+        blur size set on license plates.
+        '''
         
-        if len(license_plate.subrects) == 7:
-            for index in range(3):
-                character = license_plate.subrects[index]
-                character_image = license_plate.image.crop(Point(character.x, character.y), Point(character.x + character.w - 1, character.y + character.h - 1))
+        groups = {}
+        labels = [None] * len(characters)
+        
+        for position, (plate_index, _, _) in enumerate(characters):
+            blur_size = getattr(license_plates[plate_index], "character_blur_size", None)
+            groups.setdefault(blur_size, []).append(position)
+        
+        for blur_size, positions in groups.items():
+            group_labels = recognizer.predict_batch([characters[position][2] for position in positions], blur_size)
             
-                if character_image.data.size > 0 and character_image.data is not None:
-                    letter = self.letter_recognizer.predict(character_image, True)
-                    
-                    if isalpha(letter):
-                        plate += letter
-                    else:
-                        plate += "a"
-                else:
-                    plate += "a"
-                
-            for index in range(3, 7):
-                character = license_plate.subrects[index]
-                character_image = license_plate.image.crop(Point(character.x, character.y), Point(character.x + character.w - 1, character.y + character.h - 1))
+            for position, label in zip(positions, group_labels):
+                labels[position] = label
+        
+        return labels
+    
+    def predict_batch(self, license_plates):
+        '''
+        Predict plates of many license plates, classifying letters of all
+        plates in one call and numbers of all plates in other call. License
+        plates with other character blur size are classified in other calls.
+        '''
+        
+        plates = []
+        letters = []
+        numbers = []
+        
+        # Default characters are used when character is not found or not
+        # recognized as letter or digit.
+        for plate_index in range(len(license_plates)):
+            license_plate = license_plates[plate_index]
             
-                if character_image.data.size > 0 and character_image.data is not None:
-                    digit = self.number_recognizer.predict(character_image)
-                    
-                    if isdigit(digit):
-                        plate += digit
-                    else:
-                        plate += str(1)
-                else:
-                    plate += str(1)
+            if len(license_plate.subrects) == 7:
+                plates.append(["a", "a", "a", "1", "1", "1", "1"])
                 
-        else:
-            plate = "AAA1111"
+                for index in range(7):
+                    character_image = self._crop_character(license_plate, index)
+                    
+                    if character_image is not None:
+                        if index < 3:
+                            letters.append((plate_index, index, character_image))
+                        else:
+                            numbers.append((plate_index, index, character_image))
+            else:
+                plates.append(list("AAA1111"))
+        
+        instrumentation.count("characters_predicted", len(letters) + len(numbers))
+        
+        if len(letters) > 0:
+            with instrumentation.stage("predict_letters"):
+                labels = self._predict_characters(self.get_letter_recognizer(), letters, license_plates)
+            
+            for (plate_index, index, _), letter in zip(letters, labels):
+                if isalpha(letter):
+                    plates[plate_index][index] = letter
+        
+        if len(numbers) > 0:
+            with instrumentation.stage("predict_numbers"):
+                labels = self._predict_characters(self.get_number_recognizer(), numbers, license_plates)
+            
+            for (plate_index, index, _), digit in zip(numbers, labels):
+                if isdigit(digit):
+                    plates[plate_index][index] = digit
         
-        return plate
+        return ["".join(plate) for plate in plates]
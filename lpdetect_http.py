@@ -0,0 +1,271 @@
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from Queue import Queue, Empty
+from SocketServer import ThreadingMixIn
+from argparse import ArgumentParser
+from collections import deque
+import json
+import threading
+import time
+import urlparse
+
+import numpy as np
+
+from models.image_loader import load_image
+from models.instrumentation import instrumentation
+from models.logger import Logger
+from recognition_pipeline import load_pipeline, quadrilateral_to_list
+
+
+class RecognitionRequest:
+    '''
+    Image waiting to be recognized in a batch.
+    '''
+
+    def __init__(self, image, record=None, profile=None):
+        self.image = image
+        self.record = record
+        self.profile = profile
+        self.start = time.time()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class LatencyStatistics:
+    '''
+    Latencies of last requests, by batch size.
+    '''
+
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self.latencies = {}
+        self.lock = threading.Lock()
+
+    def add(self, batch_size, latency):
+        '''
+        Add latency of request processed in batch.
+        '''
+
+        with self.lock:
+            if batch_size not in self.latencies:
+                self.latencies[batch_size] = deque(maxlen=self.max_samples)
+
+            self.latencies[batch_size].append(latency)
+
+    def summary(self):
+        '''
+        Get p50 and p99 latencies in milliseconds, by batch size.
+        '''
+
+        summary = {}
+
+        with self.lock:
+            for batch_size, latencies in self.latencies.items():
+                latencies = np.array(latencies) * 1000
+                summary[str(batch_size)] = {"requests": len(latencies), \
+                                            "p50_ms": round(np.percentile(latencies, 50), 2), \
+                                            "p99_ms": round(np.percentile(latencies, 99), 2)}
+
+        return summary
+
+
+class MicroBatcher:
+    '''
+    Group concurrent requests in small batches processed by one thread.
+    '''
+
+    def __init__(self, pipeline, batch_size=8, max_wait=0.01):
+        self.pipeline = pipeline
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.queue = Queue()
+        self.statistics = LatencyStatistics()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+
+    def start(self):
+        '''
+        Start processing requests.
+        '''
+        self.thread.start()
+
+    def recognize(self, image, record=None, profile=None):
+        '''
+        Recognize image in next batch, waiting for result.
+        '''
+
+        request = RecognitionRequest(image, record, profile)
+        self.queue.put(request)
+        request.done.wait()
+
+        if request.error is not None:
+            raise request.error
+
+        return request.result
+
+    def _next_batch(self):
+        '''
+        Wait for first request, then for more requests until batch is full or
+        maximum wait time has passed.
+        '''
+
+        batch = [self.queue.get()]
+        deadline = time.time() + self.max_wait
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.time()
+
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+
+            # Errors of one image are returned only to its request.
+            errors = []
+
+            try:
+                results = self.pipeline.recognize_batch([request.image for request in batch], \
+                                                        [request.record for request in batch], \
+                                                        [request.profile for request in batch], errors)
+
+                for request, result, error in zip(batch, results, errors):
+                    request.result = result
+                    request.error = error
+            except Exception as error:
+                for request in batch:
+                    request.error = error
+
+            for request in batch:
+                self.statistics.add(len(batch), time.time() - request.start)
+                request.done.set()
+
+
+class RecognitionRequestHandler(BaseHTTPRequestHandler):
+    '''
+    Handle HTTP requests. POST /recognize with encoded image as body returns
+    quadrilateral and plate. Parameters "profile" or "camera" select runtime
+    profile, as /recognize?profile=fast. GET /stats returns latencies by batch size and
+    time of pipeline stages, if instrumentation is enabled.
+    '''
+
+    def _send_json(self, status, data):
+        body = json.dumps(data)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlparse.urlparse(self.path)
+
+        if url.path != "/recognize":
+            self._send_json(404, {"error": "Not found."})
+            return
+
+        parameters = urlparse.parse_qs(url.query)
+
+        try:
+            profile = self.server.batcher.pipeline.get_profile(parameters.get("profile", [None])[0], \
+                                                               parameters.get("camera", [None])[0])
+        except (KeyError, ValueError) as error:
+            self._send_json(400, {"error": str(error)})
+            return
+
+        length = int(self.headers.getheader("Content-Length", 0))
+        record = instrumentation.start_image()
+
+        # Invalid images are rejected before joining a batch.
+        try:
+            image = load_image(buffer=self.rfile.read(length), detection_width=profile.resize_width)
+        except Exception:
+            image = None
+
+        instrumentation.finish_image()
+
+        if image is None:
+            self._send_json(400, {"error": "Error to open image."})
+            return
+
+        try:
+            quadrilateral, plate = self.server.batcher.recognize(image, record, profile)
+        except Exception as error:
+            self._send_json(500, {"error": str(error)})
+            return
+
+        self._send_json(200, {"quadrilateral": quadrilateral_to_list(quadrilateral), "plate": plate})
+
+    def do_GET(self):
+        if self.path != "/stats":
+            self._send_json(404, {"error": "Not found."})
+            return
+
+        self._send_json(200, {"batch_size": self.server.batcher.batch_size, \
+                              "max_wait_ms": self.server.batcher.max_wait * 1000, \
+                              "latency": self.server.batcher.statistics.summary(), \
+                              "instrumentation": instrumentation.summary() if instrumentation.enabled else None})
+
+    def log_message(self, format, *args):
+        # Do not write a line for each request.
+        pass
+
+
+class RecognitionHTTPServer(ThreadingMixIn, HTTPServer):
+    '''
+    HTTP server that recognizes license plates in micro-batches.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, address, batcher):
+        self.batcher = batcher
+        HTTPServer.__init__(self, address, RecognitionRequestHandler)
+
+
+if __name__ == '__main__':
+    '''
+    Run HTTP license plate recognition service.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Run HTTP license plate recognition service.')
+    arg_parser.add_argument('--host', dest='host', default='127.0.0.1', help='Address to listen')
+    arg_parser.add_argument('-p', '--port', dest='port', type=int, default=8080, help='Port to listen')
+    arg_parser.add_argument('-b', '--batch-size', dest='batch_size', type=int, default=8, help='Maximum images per batch')
+    arg_parser.add_argument('-w', '--max-wait', dest='max_wait', type=float, default=10, help='Maximum milliseconds waiting to fill batch')
+    arg_parser.add_argument('--cache-size', dest='cache_size', type=int, default=0, help='Number of results of repeated images cached')
+    arg_parser.add_argument('--log', dest='log', help='Logger levels, as "INFO,models.image=DEBUG"')
+    arg_parser.add_argument('--instrument', dest='instrument', nargs='?', const='-', \
+                            help='Measure time of pipeline stages, appending records to JSON lines file if given')
+    arg_parser.add_argument('--profile', dest='profile', help='Default runtime profile, as fast, balanced or accurate')
+    args = vars(arg_parser.parse_args())
+
+    pipeline = load_pipeline(cache_size=args['cache_size'], profile=args['profile'])
+    
+    if args['log']:
+        Logger.configure(args['log'])
+        
+    if args['instrument']:
+        instrumentation.enable(args['instrument'] if args['instrument'] != '-' else None)
+        
+    pipeline.warmup()
+    batcher = MicroBatcher(pipeline, args['batch_size'], args['max_wait'] / 1000.0)
+    batcher.start()
+    server = RecognitionHTTPServer((args['host'], args['port']), batcher)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pipeline.close()
@@ -0,0 +1,303 @@
+from SocketServer import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+from argparse import ArgumentParser
+import os
+import socket
+import sys
+
+
+DEFAULT_SOCKET_PATH = os.environ.get("LPDETECT_SOCKET", "/tmp/lpdetect.sock")
+BYTES_COMMAND = "BYTES "
+STATS_COMMAND = "STATS"
+INSTRUMENTATION_COMMAND = "INSTRUMENTATION"
+LOG_COMMAND = "LOG "
+PROFILE_COMMAND = "PROFILE"
+CAMERA_COMMAND = "CAMERA"
+
+
+class LicensePlateRequestHandler(StreamRequestHandler):
+    '''
+    Handle requests sent to license plate server.
+
+    Each request is one line with an image path, or a line "BYTES <size>"
+    followed by <size> bytes of an encoded image. Each response is the line
+    printed by lpdetect, or an error line if recognition fails. A line "STATS" returns result cache counters. A line
+    "LOG <levels>" changes logger levels, as "models.image=DEBUG". A line
+    "INSTRUMENTATION" returns time of pipeline stages as JSON. Lines
+    "PROFILE <name>" and "CAMERA <camera>" select runtime profile of next
+    requests of connection, by name or by camera. Without argument, they
+    select default profile again.
+    '''
+
+    def handle(self):
+        pipeline = self.server.pipeline
+        profile = None
+        camera = None
+
+        while True:
+            line = self.rfile.readline()
+
+            if not line:
+                break
+
+            line = line.rstrip("\r\n")
+
+            if line.startswith(BYTES_COMMAND):
+                size = parse_size(line[len(BYTES_COMMAND):])
+
+                if size is None:
+                    # Bytes that follow cannot be skipped, close connection.
+                    self.wfile.write(get_recognition_error() + "\n")
+                    break
+
+                result = recognize_request(pipeline.recognize_buffer, self.rfile.read(size), profile, camera)
+            elif line == STATS_COMMAND:
+                result = format_cache_statistics(pipeline.cache)
+            elif line == INSTRUMENTATION_COMMAND:
+                result = format_instrumentation()
+            elif line.startswith(LOG_COMMAND):
+                result = configure_logger(line[len(LOG_COMMAND):])
+            elif line.split(" ")[0] in [PROFILE_COMMAND, CAMERA_COMMAND]:
+                command, _, argument = line.partition(" ")
+                new_profile, new_camera = (argument or None, None) if command == PROFILE_COMMAND else (None, argument or None)
+                result = check_profile(pipeline, new_profile, new_camera)
+
+                if result == "OK":
+                    profile, camera = new_profile, new_camera
+            elif line:
+                result = recognize_request(pipeline.recognize_path, line, profile, camera)
+            else:
+                continue
+
+            self.wfile.write(result + "\n")
+            self.wfile.flush()
+
+
+def parse_size(size):
+    '''
+    Parse size of BYTES command, returning None if it is not a non negative
+    integer.
+    '''
+    
+    try:
+        size = int(size)
+    except ValueError:
+        return None
+    
+    return size if size >= 0 else None
+
+
+def get_recognition_error():
+    '''
+    Get error line of requests that could not be recognized.
+    '''
+    
+    from recognition_pipeline import RECOGNITION_ERROR
+    return RECOGNITION_ERROR
+
+
+def recognize_request(recognize, *args):
+    '''
+    Recognize license plate of request, returning error line if recognition
+    fails, so connection and other requests are kept.
+    '''
+    
+    try:
+        return recognize(*args)
+    except Exception as error:
+        from models.logger import Logger
+        
+        Logger(__name__).log(Logger.ERROR, "Error to recognize image: %s", error)
+        return get_recognition_error()
+
+
+def format_cache_statistics(cache):
+    '''
+    Format result cache counters.
+    '''
+    
+    if cache is None:
+        return "cache=disabled"
+    
+    return "entries=%d,hits=%d,misses=%d,evictions=%d" % (len(cache.entries), cache.hits, cache.misses, cache.evictions)
+
+
+def format_instrumentation():
+    '''
+    Format summary of instrumentation as JSON.
+    '''
+    
+    import json
+    from models.instrumentation import instrumentation
+    
+    if not instrumentation.enabled:
+        return "instrumentation=disabled"
+    
+    return json.dumps(instrumentation.summary(), sort_keys=True)
+
+
+def check_profile(pipeline, profile, camera):
+    '''
+    Check if profile with name or profile of camera exists, returning "OK"
+    or error.
+    '''
+    
+    try:
+        pipeline.get_profile(profile, camera)
+    except (KeyError, ValueError) as error:
+        return str(error).strip("'\"")
+    
+    return "OK"
+
+
+def configure_logger(levels):
+    '''
+    Change logger levels, returning "OK" or error.
+    '''
+    
+    from models.logger import Logger
+    
+    try:
+        Logger.configure(levels)
+    except KeyError as error:
+        return "Unknown log level " + str(error) + "."
+    
+    return "OK"
+
+
+class LicensePlateServer(ThreadingMixIn, UnixStreamServer):
+    '''
+    Server that keeps detector and recognizer loaded between requests. Each
+    connection is handled by its own thread, so a long batch client does not
+    block other clients.
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, pipeline):
+        # Remove socket left by a server that was not stopped cleanly.
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        self.pipeline = pipeline
+        self.socket_path = socket_path
+        UnixStreamServer.__init__(self, socket_path, LicensePlateRequestHandler)
+
+    def server_close(self):
+        UnixStreamServer.server_close(self)
+
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+class LicensePlateClient:
+    '''
+    Client of license plate server.
+    '''
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH):
+        self.socket_path = socket_path
+        self.connection = None
+        self.reader = None
+
+    def connect(self):
+        '''
+        Connect to server. Return False if there is no server running.
+        '''
+
+        try:
+            self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.connection.connect(self.socket_path)
+            self.reader = self.connection.makefile("rb")
+            return True
+        except socket.error:
+            self.close()
+            return False
+
+    def close(self):
+        '''
+        Close connection.
+        '''
+
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _request(self, data):
+        self.connection.sendall(data)
+        return self.reader.readline().rstrip("\n")
+
+    def recognize_path(self, image_path):
+        '''
+        Recognize license plate in image file.
+        '''
+
+        # Server may run in other directory.
+        return self._request(os.path.abspath(image_path) + "\n")
+
+    def recognize_buffer(self, buffer):
+        '''
+        Recognize license plate in encoded image bytes.
+        '''
+
+        return self._request(BYTES_COMMAND + str(len(buffer)) + "\n" + buffer)
+
+
+def serve_stdin(pipeline, input_file=sys.stdin, output_file=sys.stdout):
+    '''
+    Recognize one image path per line from input, writing one result per line.
+    '''
+
+    for line in iter(input_file.readline, ""):
+        image_path = line.strip()
+
+        if image_path:
+            output_file.write(recognize_request(pipeline.recognize_path, image_path) + "\n")
+            output_file.flush()
+
+
+if __name__ == '__main__':
+    '''
+    Run license plate server.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Run license plate server.')
+    arg_parser.add_argument('-s', '--socket', dest='socket_path', default=DEFAULT_SOCKET_PATH, help='Unix socket path')
+    arg_parser.add_argument('--stdin', dest='stdin', action='store_true', help='Read image paths from stdin instead of socket')
+    arg_parser.add_argument('--cache-size', dest='cache_size', type=int, default=0, help='Number of results of repeated images cached')
+    arg_parser.add_argument('--log', dest='log', help='Logger levels, as "INFO,models.image=DEBUG"')
+    arg_parser.add_argument('--instrument', dest='instrument', nargs='?', const='-', \
+                            help='Measure time of pipeline stages, appending records to JSON lines file if given')
+    arg_parser.add_argument('--profile', dest='profile', help='Default runtime profile, as fast, balanced or accurate')
+    args = vars(arg_parser.parse_args())
+
+    # Load models once.
+    from recognition_pipeline import load_pipeline
+    pipeline = load_pipeline(cache_size=args['cache_size'], profile=args['profile'])
+    
+    if args['log']:
+        configure_logger(args['log'])
+        
+    if args['instrument']:
+        from models.instrumentation import instrumentation
+        instrumentation.enable(args['instrument'] if args['instrument'] != '-' else None)
+        
+    pipeline.warmup()
+
+    if args['stdin']:
+        serve_stdin(pipeline)
+    else:
+        server = LicensePlateServer(args['socket_path'], pipeline)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    pipeline.close()
@@ -0,0 +1,2 @@
+#!/bin/bash
+python lpdetect_server.py "$@"
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+
+MAGIC = "LPRBUNDLE1\n"
+ALIGNMENT = 64
+
+# Model files stored in bundle, by config option.
+FILES = {"cascade": "path_classifier",
+         "svm_hog_detector": "path_svm_hog_detector",
+         "letter_classifier": "path_letter_classifier",
+         "number_classifier": "path_number_classifier"}
+
+# KNN samples stored in bundle as float32 arrays, by config option.
+ARRAYS = {"letter_knn_images": "path_letter_knn_images_classifier",
+          "letter_knn_labels": "path_letter_knn_labels_classifier",
+          "number_knn_images": "path_number_knn_images_classifier",
+          "number_knn_labels": "path_number_knn_labels_classifier"}
+
+# Training geometry stored in bundle.
+GEOMETRY = ["image_width", "image_height", "character_width", "character_height"]
+
+
+def _align(offset):
+    '''
+    Get next aligned offset.
+    '''
+    return (offset + ALIGNMENT - 1) / ALIGNMENT * ALIGNMENT
+
+def build_bundle(config_parser, bundle_path):
+    '''
+    Build model bundle using model files from configuration.
+    '''
+
+    classifier_type = config_parser.get('data', 'character_classifier_type')
+    sections = []
+
+    for name in sorted(FILES):
+        path = config_parser.get('data', FILES[name])
+
+        if os.path.isfile(path):
+            with open(path, "rb") as model_file:
+                sections.append((name, model_file.read(), None))
+        elif name == "cascade" or name == "svm_hog_detector" or classifier_type != "knn":
+            raise ValueError("Missing model file: " + path)
+
+    if classifier_type == "knn":
+        for name in sorted(ARRAYS):
+            data = np.loadtxt(config_parser.get('data', ARRAYS[name]), np.float32)
+            sections.append((name, data.tostring(), data))
+
+    # Compute section offsets relative to payload.
+    header = {"classifier_type": classifier_type, "files": {}, "arrays": {}}
+    header.update([(option, int(config_parser.get('training', option))) for option in GEOMETRY])
+    fingerprint = hashlib.sha1(json.dumps(header, sort_keys=True))
+    offset = 0
+
+    for name, data, array in sections:
+        offset = _align(offset)
+
+        if array is None:
+            header["files"][name] = {"offset": offset, "size": len(data)}
+        else:
+            header["arrays"][name] = {"offset": offset, "dtype": str(array.dtype), "shape": list(array.shape)}
+
+        fingerprint.update(name)
+        fingerprint.update(data)
+        offset += len(data)
+
+    header["fingerprint"] = fingerprint.hexdigest()
+    header_data = json.dumps(header, sort_keys=True)
+    payload_offset = _align(len(MAGIC) + 8 + len(header_data))
+
+    # Write bundle.
+    with open(bundle_path, "wb") as bundle_file:
+        bundle_file.write(MAGIC)
+        bundle_file.write(struct.pack("<Q", len(header_data)))
+        bundle_file.write(header_data)
+
+        for name, data, _ in sections:
+            if name in header["files"]:
+                section_offset = header["files"][name]["offset"]
+            else:
+                section_offset = header["arrays"][name]["offset"]
+
+            bundle_file.seek(payload_offset + section_offset)
+            bundle_file.write(data)
+
+    return header["fingerprint"]
+
+
+class ModelBundle:
+    '''
+    Model files, KNN samples and training geometry stored in one binary file.
+    '''
+
+    def __init__(self, bundle_path):
+        self.bundle_path = os.path.abspath(bundle_path)
+
+        with open(self.bundle_path, "rb") as bundle_file:
+            if bundle_file.read(len(MAGIC)) != MAGIC:
+                raise ValueError("Invalid model bundle: " + bundle_path)
+
+            header_size = struct.unpack("<Q", bundle_file.read(8))[0]
+            self.header = json.loads(bundle_file.read(header_size))
+
+        self.payload_offset = _align(len(MAGIC) + 8 + header_size)
+        self.fingerprint = str(self.header["fingerprint"])
+        self.classifier_type = str(self.header["classifier_type"])
+
+        for option in GEOMETRY:
+            setattr(self, option, self.header[option])
+
+        # OpenCV only loads cascades and SVMs from files, so model files are
+        # extracted once to a directory next to bundle.
+        bundle_directory, bundle_name = os.path.split(self.bundle_path)
+        self.extract_directory = os.path.join(bundle_directory, "." + bundle_name + "." + self.fingerprint[:12])
+
+    def has_file(self, name):
+        '''
+        Check if bundle has model file.
+        '''
+        return name in self.header["files"]
+
+    def file_path(self, name):
+        '''
+        Get path of model file, extracting it from bundle if necessary.
+        '''
+
+        path = os.path.join(self.extract_directory, name + ".xml")
+
+        if not os.path.isfile(path):
+            section = self.header["files"][name]
+
+            if not os.path.isdir(self.extract_directory):
+                try:
+                    os.makedirs(self.extract_directory)
+                except OSError:
+                    # Other process created it.
+                    pass
+
+            with open(self.bundle_path, "rb") as bundle_file:
+                bundle_file.seek(self.payload_offset + section["offset"])
+                data = bundle_file.read(section["size"])
+
+            # Write to temporary file and rename, so concurrent loaders never
+            # see a partial file.
+            descriptor, temporary_path = tempfile.mkstemp(dir=self.extract_directory)
+
+            with os.fdopen(descriptor, "wb") as model_file:
+                model_file.write(data)
+
+            os.rename(temporary_path, path)
+
+        return path
+
+    def array(self, name):
+        '''
+        Get memory-mapped array.
+        '''
+
+        section = self.header["arrays"][name]
+        return np.memmap(self.bundle_path, dtype=np.dtype(str(section["dtype"])), mode="r", \
+                         offset=self.payload_offset + section["offset"], shape=tuple(section["shape"]))
+
+
+if __name__ == '__main__':
+    '''
+    Build model bundle.
+    '''
+
+    from ConfigParser import SafeConfigParser
+    from argparse import ArgumentParser
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Build model bundle.')
+    arg_parser.add_argument('-c', '--config', dest='config_file', default='config.ini', help='Configuration file')
+    arg_parser.add_argument('-o', '--output', dest='bundle_path', default='classifier/models.bundle', help='Bundle path')
+    args = vars(arg_parser.parse_args())
+
+    # Parses configuration file.
+    config_parser = SafeConfigParser()
+    config_parser.read(args['config_file'])
+
+    fingerprint = build_bundle(config_parser, args['bundle_path'])
+    print "Saved bundle " + args['bundle_path'] + " (" + fingerprint + ")"
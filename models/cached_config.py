@@ -0,0 +1,78 @@
+import marshal
+import os
+
+
+_configs = {}
+
+# Changed when parsed values change, so older caches are not used.
+_CACHE_VERSION = 2
+
+
+def _get_cache_path(config_file):
+    '''
+    Get path of cache of parsed configuration file.
+    '''
+    
+    directory, name = os.path.split(config_file)
+    return os.path.join(directory, "." + name + ".cache")
+
+def _parse_config(config_file):
+    '''
+    Parse configuration file as dictionary of sections.
+    '''
+    
+    from ConfigParser import SafeConfigParser
+    
+    config_parser = SafeConfigParser()
+    
+    # Keep case of option names, as camera names in camera_profiles.
+    config_parser.optionxform = str
+    config_parser.read(config_file)
+    
+    return dict((section, dict(config_parser.items(section))) for section in config_parser.sections())
+
+def read_config(config_file="config.ini"):
+    '''
+    Read configuration file as dictionary of sections. Parsed values are
+    cached next to configuration file and reused until it is modified.
+    '''
+    
+    config_file = os.path.abspath(config_file)
+    status = os.stat(config_file)
+    key = (_CACHE_VERSION, status.st_mtime, status.st_size)
+    
+    # Configuration already read by this process.
+    if config_file in _configs and _configs[config_file][0] == key:
+        return _configs[config_file][1]
+    
+    cache_path = _get_cache_path(config_file)
+    config = None
+    
+    try:
+        with open(cache_path, "rb") as cache_file:
+            cached_key, cached_config = marshal.load(cache_file)
+            
+        if cached_key == key:
+            config = cached_config
+    except (IOError, EOFError, ValueError, TypeError):
+        pass
+    
+    if config is None:
+        config = _parse_config(config_file)
+        
+        try:
+            # Write to temporary file and rename, so concurrent readers never
+            # see a partial cache.
+            temporary_path = cache_path + "." + str(os.getpid())
+            
+            with open(temporary_path, "wb") as cache_file:
+                marshal.dump((key, config), cache_file)
+                
+            os.rename(temporary_path, cache_path)
+        except (IOError, OSError):
+            # Directory is read only, parse it every time.
+            pass
+    
+    _configs[config_file] = (key, config)
+    
+    return config
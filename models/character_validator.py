@@ -6,6 +6,8 @@ Created on 06/07/2015
 
 from models.filter_characters import FilterCharacters
 from models.image import Image
+from models.frame_cache import share_frame_cache
+from models.instrumentation import instrumentation
 from models.license_plate_utils import normalize_characters_character_width, \
     normalize_characters_character_height, recrop_license_plate_image, \
     pre_process_license_plate_image
@@ -16,9 +18,22 @@ import numpy as np
 
 class CharacterValidator:
     '''
-    Adjust characters found for license plate.
+    Adjust characters found for license plate. If max_recrops is given, at
+    most max_recrops recrops of license plate image are done while adjusting
+    characters.
     '''
     
+    def __init__(self, max_recrops=None):
+        self.max_recrops = max_recrops
+        self.recrops = 0
+    
+    def _can_recrop(self):
+        '''
+        Check if license plate image can be recropped again.
+        '''
+        
+        return self.max_recrops is None or self.recrops < self.max_recrops
+    
     def _get_x_step(self, license_plate):
         '''
         Get x step to insert new characters.
@@ -206,12 +221,13 @@ class CharacterValidator:
                 end.x = character.x + character.w
                 changed_image = True
              
-        if changed_image:
+        if changed_image and self._can_recrop():
             # Recrop image and compute rectangles again.
+            self.recrops += 1
             scale = license_plate.w * 1.0 / license_plate.image.width
             license_plate = recrop_license_plate_image(license_plate, origin, end, image_original)
             
-            old_image = Image(image=license_plate.image.data)
+            old_image = share_frame_cache(Image(image=license_plate.image.data), license_plate.image)
             image_1 = pre_process_license_plate_image(license_plate.image, True)
             image_2 = pre_process_license_plate_image(old_image, False)
             
@@ -495,9 +511,15 @@ class CharacterValidator:
         m, c = self.get_least_squares(license_plate)
         
         # Normalize characters with the same width and height.
-        license_plate, m, c = normalize_characters_character_height(license_plate, image_original, height, m, c)
-        license_plate = normalize_characters_character_width(license_plate, image_original, width)
+        self.recrops = 0
+        image = license_plate.image
+        license_plate, m, c = normalize_characters_character_height(license_plate, image_original, height, m, c, self._can_recrop())
+        self.recrops += int(license_plate.image is not image)
+        image = license_plate.image
+        license_plate = normalize_characters_character_width(license_plate, image_original, width, self._can_recrop())
+        self.recrops += int(license_plate.image is not image)
         x_interval = self._get_x_step(license_plate)
+        found_characters = len(license_plate.subrects)
         
         # Adjust license plate to have at least two characters.
         if len(license_plate.subrects) < 2:
@@ -547,6 +569,7 @@ class CharacterValidator:
         
         # Sort characters.
         license_plate.subrects = sorted(license_plate.subrects, key=lambda character: character.x)
+        instrumentation.count("inserted_characters", len(license_plate.subrects) - found_characters)
             
         return license_plate
 
@@ -15,7 +15,7 @@ class ConfigData:
     Parses license plate file.
     '''
     
-    _logger = Logger()
+    _logger = Logger(__name__)
     
     '''
     Save and read config data file. 
@@ -85,7 +85,7 @@ class ConfigData:
         self.license_plates = []
         self.license_plates_text = ""
         self.quadrilaterals.clean()
-        self._logger.log(Logger.INFO, "Reading configuration data from " + self.save_path)
+        self._logger.log(Logger.INFO, "Reading configuration data from %s", self.save_path)
         
         if os.path.isfile(self.save_path):
             f = open(self.save_path, "r")
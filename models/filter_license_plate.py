@@ -8,7 +8,9 @@ from numpy import math
 from models.character_validator import CharacterValidator
 from models.filter_characters import FilterCharacters
 from models.image import Image
-from models.license_plate_utils import pre_process_license_plate_image
+from models.image_buffers import buffers, can_use_buffers, resize_into, \
+    filter_median_into
+from models.license_plate_utils import pre_process_license_plate_image, crop_and_resize
 from models.point import Point
 
 
@@ -17,53 +19,135 @@ class FilterLicensePlate:
     Filter of license plates.
     '''
     
-    def filter_using_svm(self, license_plates, image, svm_detector, image_width, image_height):
+    def filter_using_svm(self, license_plates, image, svm_detector, image_width, image_height, pool=None, median_retry=True):
         '''
-        Filter misclassified license plates using SVM.
+        Filter misclassified license plates using SVM. If median_retry is
+        True, license plates rejected are accepted if their median filtered
+        version is classified as license plate.
         '''
-        filtered_license_plates = []
         
-        for license_plate in license_plates:
+        if len(license_plates) == 0:
+            return []
+        
+        total = len(license_plates)
+        copies = 2 if median_retry else 1
+        samples = [None] * (copies * total)
+        
+        # Resize candidates and filter them with median, into buffers reused by
+        # next frames.
+        buffers_data = buffers.get_stack("svm_samples", copies * total, (image_height, image_width))
+        
+        for index, license_plate in enumerate(license_plates):
             license_plate_image = image.crop(Point(license_plate.x, license_plate.y), \
                                              Point(license_plate.x + license_plate.w, \
                                                    license_plate.y + license_plate.h))
-            license_plate_image = license_plate_image.resize(image_width, image_height)
             
-            if svm_detector.predict(license_plate_image) > 0:
-                filtered_license_plates.append(license_plate)
+            if can_use_buffers(license_plate_image.data):
+                resize_into(license_plate_image.data, image_width, image_height, dst=buffers_data[index])
+                samples[index] = Image(image=buffers_data[index])
+                
+                if median_retry:
+                    filter_median_into(buffers_data[index], 3, dst=buffers_data[total + index])
+                    samples[total + index] = Image(image=buffers_data[total + index])
             else:
-                license_plate_image_old = Image(image=license_plate_image.data)
-                license_plate_image_old.filter_median(size=3)
+                samples[index] = license_plate_image.resize(image_width, image_height)
                 
-                if svm_detector.predict(license_plate_image_old) > 0:
+                if median_retry:
+                    license_plate_image_old = Image(image=samples[index].data)
+                    license_plate_image_old.filter_median(size=3)
+                    samples[total + index] = license_plate_image_old
+        
+        # Classify license plates and their median filtered versions in one call.
+        labels, margins = svm_detector.predict_batch(samples, return_scores=True, pool=pool)
+        filtered_license_plates = []
+        
+        for index, license_plate in enumerate(license_plates):
+            if not median_retry:
+                if labels[index] > 0:
+                    license_plate.score = margins[index]
                     filtered_license_plates.append(license_plate)
-                    
+            elif labels[index] > 0 or labels[total + index] > 0:
+                license_plate.score = max(margins[index], margins[total + index])
+                filtered_license_plates.append(license_plate)
+        
         return filtered_license_plates
     
-    def get_best_license_plate(self, license_plates, image_original, resize_width=400):
+    def prune_license_plates(self, license_plates, top_k, overlap=0.5):
         '''
-        Get best license plate.
+        Keep top k license plates with greatest SVM margins, suppressing
+        license plates that overlap one with greater margin.
         '''
-        best_license_plate = None
         
-        # Detect characters in license plate.
+        license_plates = sorted(license_plates, key=lambda x: -x.score)
+        pruned_license_plates = []
+        
         for license_plate in license_plates:
-            character_validator = CharacterValidator()
-            image = image_original.crop(Point(license_plate.x, license_plate.y), Point(license_plate.x + license_plate.w, license_plate.y + license_plate.h))
-            image = image.resize(resize_width, resize_width * image.height / image.width)
-            image = pre_process_license_plate_image(image, adaptative=False)
+            if len(pruned_license_plates) >= top_k:
+                break
+            
+            if all(license_plate.overlap(kept) <= overlap for kept in pruned_license_plates):
+                pruned_license_plates.append(license_plate)
+        
+        return pruned_license_plates
+    
+    def _detect_characters(self, license_plate, image_original, resize_width):
+        '''
+        Detect characters in license plate.
+        '''
+        character_validator = CharacterValidator()
+        image = crop_and_resize(image_original, Point(license_plate.x, license_plate.y), Point(license_plate.x + license_plate.w, license_plate.y + license_plate.h), \
+                                resize_width)
+        image = pre_process_license_plate_image(image, adaptative=False)
+        license_plate.image = image
+        license_plate.subrects = image.compute_rectangles_for_characters()
+        character_validator.remove_wrong_characters(license_plate)
+        
+        # If not enough characters detected, binarize image using adaptative method. 
+        if len(license_plate.subrects) < 2:
+            image = crop_and_resize(image_original, Point(license_plate.x, license_plate.y), Point(license_plate.x + license_plate.w, license_plate.y + license_plate.h), \
+                                    resize_width)
+            image = pre_process_license_plate_image(image, True)
             license_plate.image = image
             license_plate.subrects = image.compute_rectangles_for_characters()
             character_validator.remove_wrong_characters(license_plate)
+        
+        return license_plate
+    
+    def get_best_license_plate(self, license_plates, image_original, resize_width=400, early_stop_characters=None, pool=None, \
+                               threads=1):
+        '''
+        Get best license plate. If early_stop_characters is given, stop after
+        first license plate with that many characters. If pool is given,
+        characters of license plates are detected concurrently, in waves of
+        one license plate per thread when early stop is used.
+        '''
+        best_license_plate = None
+        detect = lambda license_plate: self._detect_characters(license_plate, image_original, resize_width)
+        
+        if pool is None:
+            wave_size = 1
+        elif early_stop_characters is None:
+            wave_size = len(license_plates)
+        else:
+            wave_size = max(1, threads)
+        
+        # Detect characters in license plates, in the order given.
+        for start in range(0, len(license_plates), wave_size):
+            wave = license_plates[start:start + wave_size]
             
-            # If not enough characters detected, binarize image using adaptative method. 
-            if len(license_plate.subrects) < 2:
-                image = image_original.crop(Point(license_plate.x, license_plate.y), Point(license_plate.x + license_plate.w, license_plate.y + license_plate.h))
-                image = image.resize(resize_width, resize_width * image.height / image.width)
-                image = pre_process_license_plate_image(image, True)
-                license_plate.image = image
-                license_plate.subrects = image.compute_rectangles_for_characters()
-                character_validator.remove_wrong_characters(license_plate)
+            if len(wave) > 1:
+                pool.map(detect, wave)
+            else:
+                detect(wave[0])
+            
+            # Keep license plates until first one with enough characters.
+            if early_stop_characters is not None:
+                complete = [index for index in range(start, start + len(wave)) \
+                            if len(license_plates[index].subrects) >= early_stop_characters]
+                
+                if len(complete) > 0:
+                    license_plates = license_plates[:complete[0] + 1]
+                    break
         
         # Find best license plate by total of characters and area. 
         if len(license_plates) > 0:
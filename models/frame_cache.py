@@ -0,0 +1,101 @@
+import threading
+
+
+class FrameCache:
+    '''
+    Images derived from one frame, keyed by the operations, parameters and
+    region used to compute them from the frame.
+    '''
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        '''
+        Get image data with key, computing it if necessary. Returned data
+        must not be changed.
+        '''
+
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                return self.entries[key]
+
+        data = compute()
+
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = data
+                self.misses += 1
+
+            return self.entries[key]
+
+    def clear(self):
+        '''
+        Remove images of frame.
+        '''
+
+        with self.lock:
+            self.entries = {}
+
+
+def attach_frame_cache(image, frame_cache, key):
+    '''
+    Mark image as derived from frame with key.
+    '''
+
+    image.frame_cache = frame_cache
+    image.cache_key = key
+    image.cache_data = image.data
+
+    return image
+
+def share_frame_cache(image, source_image):
+    '''
+    Mark image wrapping data of source image as derived in the same way.
+    '''
+
+    if get_frame_cache(source_image) is not None and image.data is source_image.data:
+        attach_frame_cache(image, source_image.frame_cache, source_image.cache_key)
+
+    return image
+
+def get_frame_cache(image):
+    '''
+    Get frame cache of image, or None if image was not derived through cache
+    or its data has changed since.
+    '''
+
+    if image.frame_cache is None or image.cache_key is None or image.cache_data is not image.data:
+        return None
+
+    return image.frame_cache
+
+def derive(image, operations):
+    '''
+    Replace data of image by result of applying list of (operation, compute)
+    in order, reusing results of the same operations on the same frame region
+    if they were already computed.
+    '''
+
+    frame_cache = get_frame_cache(image)
+
+    if frame_cache is None:
+        for _, compute in operations:
+            image._set_image_data(compute(image.data))
+
+        return image
+
+    key = image.cache_key
+    data = image.data
+
+    for operation, compute in operations:
+        key = key + (operation,)
+        data = frame_cache.get(key, lambda: compute(data))
+
+    # Stages change image data in place, hand out a copy of last result only.
+    image._set_image_data(data.copy())
+    return attach_frame_cache(image, frame_cache, key)
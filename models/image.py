@@ -5,11 +5,12 @@ Created on 05/04/2015
          Flavio Nicastro
 '''
 
-from argparse import ArgumentParser
 import cv2
 import os
 
 from models.logger import Logger
+from models.lookup_tables import apply_lookup_table, CONTRAST_TABLE, \
+    DOUBLE_TABLE, INVERT_TABLE
 from models.rect import Rect
 import numpy as np
 
@@ -19,14 +20,29 @@ class Image:
     Reads and process image. 
     '''
     
-    _logger = Logger()
+    _logger = Logger(__name__)
     data = None  # The image data.
+    frame_cache = None  # Cache of images derived from the same frame.
+    cache_key = None  # Operations used to derive image from frame.
+    cache_data = None  # Data when image was derived.
     
-    def __init__(self, file_path=None, image=None):
+    def __init__(self, file_path=None, image=None, buffer=None):
         # Create image from matrix.
         if image is not None:
             self._set_image_data(image)
         
+        # Decode image if user specified encoded bytes.
+        elif buffer is not None:
+            self._logger.log(Logger.INFO, "Decoding image from buffer.")
+            image_data = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), 1)
+            
+            if image_data is not None:
+                # Convert image to rgb.
+                image_data = cv2.cvtColor(image_data, cv2.COLOR_BGR2RGB)
+                self._set_image_data(image_data)
+            else:
+                self._logger.log(Logger.ERROR, "Buffer does not contain a valid image.")
+        
         # Load image if user specified file path.
         elif file_path is not None:
             # Check if file exist.
@@ -35,7 +51,7 @@ class Image:
                 file_path = os.path.abspath(file_path)
             
                 # Load image                
-                self._logger.log(Logger.INFO, "Loading image " + file_path)
+                self._logger.log(Logger.INFO, "Loading image %s", file_path)
                 image_data = cv2.imread(file_path)
                 self.file_path = file_path
                 
@@ -49,7 +65,7 @@ class Image:
                 self._set_image_data(image_data)
             else:
                 # File does not exist.
-                self._logger.log(Logger.ERROR, "File '" + file_path + "' does not exist.")
+                self._logger.log(Logger.ERROR, "File '%s' does not exist.", file_path)
     
     def _set_image_data(self, data):
         '''
@@ -129,9 +145,7 @@ class Image:
                     self.contrast()
                 
                 if mean < 20:
-                    self.data = self.data.astype(int)
-                    self.data = self.data * 2
-                    self.data = np.uint8(self.data)
+                    self.data = apply_lookup_table(self.data, DOUBLE_TABLE)
                     
                 self.equalize()
                 
@@ -210,7 +224,7 @@ class Image:
         elif image is not None:
             self._set_image_data(image)
             
-        self._logger.log(Logger.INFO, "Resizing image to: width = " + str(width) + " height = " + str(height))
+        self._logger.log(Logger.INFO, "Resizing image to: width = %s height = %s", width, height)
         
         try:
             if width > 0 and height > 0:
@@ -270,8 +284,8 @@ class Image:
                 end.y = origin.y
                 origin.y = change
                 
-            self._logger.log(Logger.INFO, "Cropping image. Origin: (%d, %d) End: (%d, %d)" \
-                % (origin.x, origin.y, end.x, end.y))
+            self._logger.log(Logger.INFO, "Cropping image. Origin: (%d, %d) End: (%d, %d)", \
+                             origin.x, origin.y, end.x, end.y)
             return Image(image = self.data[origin.y:end.y, origin.x:end.x])
     
         
@@ -294,7 +308,7 @@ class Image:
                 
             # Invert binary image.
             self._logger.log(Logger.INFO, "Invert binary image.")
-            self.data = cv2.bitwise_not(self.data)
+            self.data = apply_lookup_table(self.data, INVERT_TABLE)
         
         return self.data
       
@@ -364,6 +378,9 @@ class Image:
                 self._logger.log(Logger.DEBUG, "We need to convert image to gray scale before computing rectangles.")
                 self.convert_to_gray(self.data)
             
+            # Data is changed in place, it is no longer the cached image.
+            self.cache_key = None
+            
             thresh = cv2.Canny(self.data, 1 ,100)
             contours, _ = cv2.findContours(thresh, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
             filtered_contours = []
@@ -481,11 +498,8 @@ class Image:
                 self._logger.log(Logger.DEBUG, "We need to convert image to gray scale before contrasting image.")
                 self.convert_to_gray(self.data)
                 
-            alpha = 2
-            self.data = self.data.astype(int)
-            self.data = np.power(self.data, alpha)
-            self.data = np.multiply(self.data, 1.0 / 255 ** (alpha -1))
-            self.data = np.uint8(self.data)                
+            self.data = apply_lookup_table(self.data, CONTRAST_TABLE)
+            
         return self.data
     
     def compute_edges(self, image=None):
@@ -562,7 +576,7 @@ class Image:
             if len(self.data.shape) == 3:
                 image = cv2.cvtColor(self.data, cv2.COLOR_RGB2BGR)
                         
-            self._logger.log(Logger.INFO, "Saving image in " + self.file_path)
+            self._logger.log(Logger.INFO, "Saving image in %s", self.file_path)
             cv2.imwrite(self.file_path, image);
         
 if __name__ == '__main__':
@@ -570,6 +584,8 @@ if __name__ == '__main__':
     Load and plot image.
     '''
     
+    from argparse import ArgumentParser
+    
     # Parses args.
     parser = ArgumentParser(description='Load and plot image.')
     parser.add_argument('file_path', help='image file path')
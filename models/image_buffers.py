@@ -0,0 +1,95 @@
+import threading
+
+import cv2
+
+from models.lookup_tables import INVERT_TABLE
+import numpy as np
+
+
+class ImageBuffers(threading.local):
+    '''
+    Preallocated image buffers of current thread, reused by stages with fixed
+    image sizes.
+    '''
+
+    enabled = True
+
+    def __init__(self):
+        self.buffers = {}
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        '''
+        Get buffer with name and shape, allocating it only if shape changed.
+        Data of buffer is overwritten by next use of the same name.
+        '''
+
+        buffer = self.buffers.get(name)
+
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buffer
+            self.allocations += 1
+
+        return buffer
+
+    def get_stack(self, name, count, shape, dtype=np.uint8):
+        '''
+        Get count buffers with shape, stored in one array that only grows.
+        '''
+
+        buffer = self.buffers.get(name)
+
+        if buffer is None or buffer.shape[0] < count or buffer.shape[1:] != shape or buffer.dtype != dtype:
+            buffer = np.empty((max(count, 2 * (buffer.shape[0] if buffer is not None else 0)),) + shape, dtype=dtype)
+            self.buffers[name] = buffer
+            self.allocations += 1
+
+        return buffer[:count]
+
+
+# Buffers of each thread.
+buffers = ImageBuffers()
+
+
+def can_use_buffers(data):
+    '''
+    Check if buffers can be used for image data: gray and not empty.
+    '''
+
+    return ImageBuffers.enabled and data is not None and data.ndim == 2 and data.size > 0
+
+def resize_into(data, width, height, name=None, dst=None):
+    '''
+    Resize image data as Image.resize does, writing into buffer with name or
+    into dst.
+    '''
+
+    if dst is None:
+        dst = buffers.get(name, (height, width), data.dtype)
+
+    return cv2.resize(data, (width, height), dst, interpolation=cv2.INTER_AREA)
+
+def filter_median_into(data, size, name=None, dst=None):
+    '''
+    Filter image data with median, writing into buffer with name or into dst.
+    '''
+
+    if dst is None:
+        dst = buffers.get(name, data.shape, data.dtype)
+
+    return cv2.medianBlur(data, size, dst)
+
+def invert_into(data, name):
+    '''
+    Invert image data, writing into buffer with name.
+    '''
+
+    return cv2.LUT(data, INVERT_TABLE, buffers.get(name, data.shape, data.dtype))
+
+def filter_gaussian_blur_into(data, size, name):
+    '''
+    Filter image data with gaussian blur, writing into buffer with name.
+    '''
+
+    return cv2.GaussianBlur(data, (size, size), 0, buffers.get(name, data.shape, data.dtype))
@@ -0,0 +1,100 @@
+import cv2
+
+from models.image import Image
+from models.instrumentation import instrumentation
+from models.logger import Logger
+import numpy as np
+
+
+# Decode straight to gray, OpenCV 2.4 has no reduced size decode.
+GRAYSCALE_FLAG = 0
+
+
+class DecodedImage(Image):
+    '''
+    Gray image decoded from encoded bytes, with a copy reduced by image
+    pyramid to at least detection width. OpenCV 2.4 decodes neither at
+    reduced size nor a region, so full resolution is decoded once and the
+    detector only crops license plate regions of it.
+    '''
+
+    def __init__(self, buffer, detection_width=400):
+        self.reduced = None
+
+        if len(buffer) == 0:
+            self._logger.log(Logger.ERROR, "Buffer is empty.")
+            return
+
+        with instrumentation.stage("decode"):
+            data = cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), GRAYSCALE_FLAG)
+
+        if data is None:
+            self._logger.log(Logger.ERROR, "Buffer does not contain a valid image.")
+            return
+
+        self._set_image_data(data)
+
+        # Halve image while it stays at least as wide as detection width.
+        with instrumentation.stage("pyramid"):
+            reduced = data
+
+            while reduced.shape[1] / 2 >= detection_width:
+                reduced = cv2.pyrDown(reduced)
+
+        if reduced is not data:
+            self.reduced = Image(image=reduced)
+
+    def is_valid(self):
+        '''
+        Check if image was decoded.
+        '''
+
+        return self.data is not None
+
+    def get_detection_source(self):
+        '''
+        Get image used to compute detection image: reduced image if there is
+        one, otherwise full resolution image.
+        '''
+
+        if self.reduced is not None:
+            return self.reduced
+
+        return self
+
+
+def load_image(file_path=None, buffer=None, detection_width=400):
+    '''
+    Load gray image from file or encoded bytes. Return None if file cannot be
+    read or bytes cannot be decoded.
+    '''
+
+    if file_path is not None:
+        try:
+            with open(file_path, "rb") as image_file:
+                buffer = image_file.read()
+        except IOError:
+            return None
+
+    if buffer is None:
+        return None
+
+    image = DecodedImage(buffer, detection_width)
+
+    if not image.is_valid():
+        return None
+    
+    if file_path is not None:
+        image.file_path = file_path
+
+    return image
+
+def get_detection_source(image):
+    '''
+    Get image used to compute detection image of image.
+    '''
+
+    if isinstance(image, DecodedImage):
+        return image.get_detection_source()
+
+    return image
@@ -0,0 +1,241 @@
+import json
+import os
+import sys
+import threading
+import time
+
+
+# Upper limits of histogram buckets, in milliseconds.
+HISTOGRAM_LIMITS = [0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+
+class Histogram:
+    '''
+    Histogram of durations in milliseconds.
+    '''
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_LIMITS) + 1)
+        self.total = 0
+        self.total_time = 0.0
+
+    def add(self, duration):
+        '''
+        Add duration in milliseconds.
+        '''
+
+        index = 0
+
+        while index < len(HISTOGRAM_LIMITS) and duration > HISTOGRAM_LIMITS[index]:
+            index += 1
+
+        self.counts[index] += 1
+        self.total += 1
+        self.total_time += duration
+
+    def summary(self):
+        '''
+        Get count, mean and count of each bucket, labeled by its upper limit.
+        '''
+
+        buckets = {}
+
+        for limit, count in zip([str(limit) for limit in HISTOGRAM_LIMITS] + ["inf"], self.counts):
+            if count > 0:
+                buckets["<=" + limit] = count
+
+        mean = self.total_time / self.total if self.total > 0 else 0.0
+        return {"count": self.total, "mean_ms": round(mean, 3), "buckets": buckets}
+
+
+class _NoStage:
+    '''
+    Stage used when instrumentation is disabled.
+    '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        return False
+
+
+class _Stage:
+    '''
+    Stage timed in record.
+    '''
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        stages = self.record["stages"]
+        stages[self.name] = stages.get(self.name, 0.0) + (time.time() - self.start) * 1000
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+class Instrumentation:
+    '''
+    Wall time and counts of pipeline stages of each image. Records of images
+    are aggregated in histograms and optionally written as JSON lines.
+    While disabled, stages and counts do nothing. Stages run by worker
+    threads of a pool are measured as part of the stage waiting for them.
+    '''
+
+    def __init__(self):
+        self.enabled = False
+        self.sink = None
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counts = {}
+        self.images = 0
+
+    def enable(self, sink_path=None):
+        '''
+        Enable instrumentation, appending records to JSON lines file if
+        sink path is given.
+        '''
+
+        self.enabled = True
+
+        if sink_path:
+            self.sink = open(sink_path, "a")
+
+    def disable(self):
+        '''
+        Disable instrumentation and close sink.
+        '''
+
+        self.enabled = False
+
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    def start_image(self, name=None):
+        '''
+        Start record of image processed by current thread.
+        '''
+
+        if self.enabled:
+            self.local.record = {"image": name, "stages": {}, "counts": {}}
+        else:
+            self.local.record = None
+
+        return self.local.record
+
+    def finish_image(self):
+        '''
+        Stop recording image of current thread and return its record.
+        '''
+
+        record = getattr(self.local, "record", None)
+        self.local.record = None
+
+        return record
+
+    def resume_image(self, record):
+        '''
+        Continue recording stages of record in current thread.
+        '''
+
+        self.local.record = record
+
+    def stage(self, name):
+        '''
+        Get context manager measuring wall time of stage in record of current
+        thread.
+        '''
+
+        if not self.enabled:
+            return _NO_STAGE
+
+        record = getattr(self.local, "record", None)
+
+        if record is None:
+            return _NO_STAGE
+
+        return _Stage(record, name)
+
+    def count(self, name, value=1):
+        '''
+        Add value to counter in record of current thread.
+        '''
+
+        if not self.enabled:
+            return
+
+        record = getattr(self.local, "record", None)
+
+        if record is not None:
+            record["counts"][name] = record["counts"].get(name, 0) + value
+
+    def publish(self, record):
+        '''
+        Add record to histograms and write it to sink.
+        '''
+
+        if record is None:
+            return
+
+        with self.lock:
+            self.images += 1
+
+            for name, duration in record["stages"].items():
+                if name not in self.histograms:
+                    self.histograms[name] = Histogram()
+
+                self.histograms[name].add(duration)
+
+            for name, value in record["counts"].items():
+                self.counts[name] = self.counts.get(name, 0) + value
+
+            if self.sink is not None:
+                self.sink.write(json.dumps(record, sort_keys=True) + "\n")
+                self.sink.flush()
+
+    def summary(self):
+        '''
+        Get images recorded, histogram of each stage and total of each count.
+        '''
+
+        with self.lock:
+            return {"images": self.images, \
+                    "stages": dict((name, histogram.summary()) for name, histogram in self.histograms.items()), \
+                    "counts": dict(self.counts)}
+
+    def report(self, output_file=sys.stderr):
+        '''
+        Write mean time of each stage and totals of counts.
+        '''
+
+        summary = self.summary()
+
+        if summary["images"] == 0:
+            return
+
+        output_file.write("Instrumented images: %d\n" % summary["images"])
+
+        for name, stage in sorted(summary["stages"].items(), key=lambda item: -item[1]["mean_ms"] * item[1]["count"]):
+            output_file.write("  %-20s %8.2f ms/call, %d calls\n" % (name, stage["mean_ms"], stage["count"]))
+
+        for name, value in sorted(summary["counts"].items()):
+            output_file.write("  %-20s %8.1f/image\n" % (name, value * 1.0 / summary["images"]))
+
+
+# Instrumentation shared by all stages of process.
+instrumentation = Instrumentation()
+
+# Instrumentation can be enabled for a process with environment variable
+# LPDETECT_INSTRUMENT, set to a JSON lines file path or to "-" for no file.
+if os.environ.get("LPDETECT_INSTRUMENT"):
+    instrumentation.enable(os.environ["LPDETECT_INSTRUMENT"] if os.environ["LPDETECT_INSTRUMENT"] != "-" else None)
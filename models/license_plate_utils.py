@@ -6,7 +6,10 @@ Created on 11/07/2015
 import copy
 
 import models.character_validator
+from models.frame_cache import derive, get_frame_cache, attach_frame_cache, \
+    share_frame_cache
 from models.image import Image
+from models.instrumentation import instrumentation
 from models.point import Point
 from models.quadrilateral import Quadrilateral
 from models.rect import Rect
@@ -40,7 +43,7 @@ def normalize_characters_character_height(license_plate, image_original, charact
         # Recrop image and compute rectangles again.
         license_plate = recrop_license_plate_image(license_plate, origin, end, image_original)        
         character_validator = models.character_validator.CharacterValidator()
-        backup_image = Image(image=license_plate.image.data)
+        backup_image = share_frame_cache(Image(image=license_plate.image.data), license_plate.image)
         image = pre_process_license_plate_image(license_plate.image, adaptative=False)
         license_plate.subrects = image.compute_rectangles_for_characters()
         character_validator.remove_wrong_characters(license_plate)
@@ -84,7 +87,7 @@ def normalize_characters_character_width(license_plate, image_original, characte
         # Recrop image and compute rectangles again.
         license_plate = recrop_license_plate_image(license_plate, origin, end, image_original)        
         character_validator = models.character_validator.CharacterValidator()
-        backup_image = Image(image=license_plate.image.data)
+        backup_image = share_frame_cache(Image(image=license_plate.image.data), license_plate.image)
         image = pre_process_license_plate_image(license_plate.image, adaptative=False)
         license_plate.subrects = image.compute_rectangles_for_characters()
         character_validator.remove_wrong_characters(license_plate)
@@ -111,21 +114,52 @@ def reescale_license_plate(license_plate, original_image_width, scale_image_widt
     reescaled_license_plate.h = int((reescaled_license_plate.y + reescaled_license_plate.h - reescaled_license_plate.y) * ratio)
     reescaled_license_plate.x = int(reescaled_license_plate.x * ratio)
     reescaled_license_plate.y = int(reescaled_license_plate.y * ratio)
+    reescaled_license_plate.score = license_plate.score
     
     return reescaled_license_plate
 
+def _filter_median(data):
+    return Image(image=data).filter_median(size=3)
+
+def _binarize(data, adaptative, morphologic):
+    image = Image(image=data)
+    image.binarize(adaptative=adaptative)
+    
+    return image.compute_morphologic(morphologic=morphologic)
+
 def pre_process_license_plate_image(license_plate_image, adaptative=False, morphologic=1):
     '''
     Pre-process license plate image.
     '''
     
-    license_plate_image.filter_median(size=3)
+    operations = [(("median", 3), _filter_median)]
     
     if morphologic == 1 or morphologic == 3:
-        license_plate_image.binarize(adaptative=adaptative)
-        license_plate_image.compute_morphologic(morphologic=morphologic)
+        operations.append((("binarize", adaptative, morphologic), lambda data: _binarize(data, adaptative, morphologic)))
         
-    return license_plate_image
+    return derive(license_plate_image, operations)
+
+def crop_and_resize(image_original, origin, end, width, height=None):
+    '''
+    Crop region of image and resize it. If height is not given, keep aspect
+    ratio of region.
+    '''
+    
+    image = image_original.crop(origin, end)
+    
+    if height is None:
+        height = width * image.height / image.width
+    
+    frame_cache = get_frame_cache(image_original)
+    
+    if frame_cache is None:
+        return image.resize(width, height)
+    
+    # Key uses region corrected by crop.
+    key = image_original.cache_key + (("crop", origin.x, origin.y, end.x, end.y), ("resize", width, height))
+    data = frame_cache.get(key, lambda: image.resize(width, height).data)
+    
+    return attach_frame_cache(Image(image=data.copy()), frame_cache, key)
 
 def recrop_license_plate_image(license_plate, origin, end, image_original, morphologic=1):
     '''
@@ -164,9 +198,9 @@ def recrop_license_plate_image(license_plate, origin, end, image_original, morph
         character.w = int(character.w*scale + 0.5)
         
     # Recrop image.
-    license_plate.image = image_original.crop(origin, end)
-    scale = old_width*1.0/license_plate.image.width
-    license_plate.image = license_plate.image.resize(old_width, int(old_width / ratio))
+    instrumentation.count("recrops")
+    license_plate.image = crop_and_resize(image_original, origin, end, old_width, int(old_width / ratio))
+    scale = old_width*1.0/(end.x - origin.x)
     license_plate.image = pre_process_license_plate_image(license_plate.image, False, 2)
      
     for character in license_plate.subrects:
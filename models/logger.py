@@ -3,29 +3,114 @@ Created on 01/05/2015
 
 @author: Alexandre Yukio Yamashita
 '''
+import os
+import sys
+
 
 class Logger:
     '''
-    Simple logger to print messages. 
+    Leveled logger. Messages are formatted with their arguments only if the
+    level of the logger name allows them.
     '''
-    
+
     INFO, ERROR, DEBUG = range(3)
-     
-    def log(self, category, message):
+
+    # Severity of each category, messages below level of logger are ignored.
+    _severities = {DEBUG: 10, INFO: 20, ERROR: 40}
+    _names = {"DEBUG": DEBUG, "INFO": INFO, "ERROR": ERROR}
+
+    # Level of each configured name, "" is the default level.
+    _levels = {"": 40}
+    _output_file = sys.stderr
+
+    def __init__(self, name=""):
+        self.name = name
+
+    @classmethod
+    def set_level(cls, category, name=""):
+        '''
+        Set level of logger name and of names below it, as "models" for
+        "models.image". Category None disables messages.
+        '''
+
+        if category is None:
+            cls._levels[name] = 100
+        else:
+            cls._levels[name] = cls._severities[category]
+
+    @classmethod
+    def configure(cls, levels):
+        '''
+        Configure levels from string as "ERROR" or "INFO,models.image=DEBUG".
+        No level is set if any category is unknown.
+        '''
+
+        parsed_levels = []
+
+        for level in levels.split(","):
+            level = level.strip()
+
+            if not level:
+                continue
+
+            if "=" in level:
+                name, category = [value.strip() for value in level.split("=", 1)]
+            else:
+                name, category = "", level
+
+            category = category.upper()
+            parsed_levels.append((None if category == "OFF" else cls._names[category], name))
+
+        for category, name in parsed_levels:
+            cls.set_level(category, name)
+
+    @classmethod
+    def get_level(cls, name):
+        '''
+        Get level of logger name, from the longest configured name containing it.
         '''
-        Log message.
+
+        while name not in cls._levels:
+            name = name.rpartition(".")[0] if "." in name else ""
+
+        return cls._levels[name]
+
+    def is_enabled(self, category):
+        '''
+        Check if messages of category are logged.
+        '''
+        return self._severities[category] >= self.get_level(self.name)
+
+    def log(self, category, message, *args):
         '''
-        #print "[" + self._get_category_string(category) + "] " + message
-    
+        Log message, formatting it with args only if category is enabled.
+        '''
+
+        if self._severities[category] < self.get_level(self.name):
+            return
+
+        if args:
+            message = message % args
+
+        self._output_file.write("[" + self._get_category_string(category) + "] " + \
+                                (self.name + ": " if self.name else "") + message + "\n")
+
     def _get_category_string(self, category):
         '''
         Get category string.
         '''
         if category == self.ERROR:
             category_string = "ERROR"
-        elif category == self.DEBUG:            
+        elif category == self.DEBUG:
             category_string = "DEBUG"
-        else:            
+        else:
             category_string = "INFO"
-        
+
         return category_string
+
+
+# Levels can be set for a process with environment variable LPDETECT_LOG.
+try:
+    Logger.configure(os.environ.get("LPDETECT_LOG", ""))
+except KeyError as error:
+    Logger(__name__).log(Logger.ERROR, "Unknown log level %s in LPDETECT_LOG.", error)
@@ -0,0 +1,25 @@
+import cv2
+
+import numpy as np
+
+
+def _create_table(values):
+    return np.uint8(values).reshape(256)
+
+# Square intensities, normalized to 255. Same values of np.uint8(i^2 / 255).
+CONTRAST_TABLE = _create_table(np.multiply(np.power(np.arange(256), 2), 1.0 / 255))
+
+# Double intensities, wrapping around as uint8 conversion of 2 * i does.
+DOUBLE_TABLE = _create_table(np.arange(256) * 2 % 256)
+
+# Invert intensities.
+INVERT_TABLE = _create_table(255 - np.arange(256))
+
+
+def apply_lookup_table(data, table):
+    '''
+    Map each pixel of uint8 image through 256 entries table, without
+    intermediate arrays.
+    '''
+    
+    return cv2.LUT(data, table)
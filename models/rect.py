@@ -19,6 +19,8 @@ class Rect:
     image = []
     fit = 1
     quadrilateral = None
+    score = 0.0
+    ransac_iterations = 200
     
     def __init__(self, array):
         self.x = int(array[0])
@@ -55,6 +57,19 @@ class Rect:
         else:
             return False
     
+    def overlap(self, p):
+        '''
+        Get intersection over union with p.
+        '''
+        width = min(self.x + self.w, p.x + p.w) - max(self.x, p.x)
+        height = min(self.y + self.h, p.y + p.h) - max(self.y, p.y)
+        
+        if width <= 0 or height <= 0:
+            return 0.0
+        
+        intersection = width * height
+        return intersection * 1.0 / (self.w * self.h + p.w * p.h - intersection)
+    
     def equal(self, p):
         '''
         Check if rectangle is equal to p.
@@ -98,7 +113,7 @@ class Rect:
             input_model = np.array([[rect.x, rect.y] for rect in self.subrects])
             model = LinearLeastSquaresModel([0], [1], debug=False)
             _ransac_fit, ransac_data, _better_model = ransac(input_model, model, \
-                                                           total, 200, 1000, 0, \
+                                                           total, self.ransac_iterations, 1000, 0, \
                                                            debug=False, return_all=True)
             
             subrects = [self.subrects[i] for i in ransac_data['inliers']]
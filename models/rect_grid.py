@@ -0,0 +1,92 @@
+class RectGrid:
+    '''
+    Uniform grid indexing rectangles by their top left corner, used to find
+    rectangles near a position without comparing against all of them.
+    '''
+
+    def __init__(self, cell_size=5):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.positions = {}
+
+    def _get_cell(self, x, y):
+        return (int(x) // self.cell_size, int(y) // self.cell_size)
+
+    def add(self, index, rect):
+        '''
+        Add rectangle with index.
+        '''
+
+        cell = self._get_cell(rect.x, rect.y)
+        self.cells.setdefault(cell, set()).add(index)
+        self.positions[index] = cell
+
+    def remove(self, index):
+        '''
+        Remove rectangle with index.
+        '''
+
+        cell = self.positions.pop(index)
+        self.cells[cell].discard(index)
+
+        if len(self.cells[cell]) == 0:
+            del self.cells[cell]
+
+    def move(self, index, rect):
+        '''
+        Update position of rectangle with index after it has changed.
+        '''
+
+        if self._get_cell(rect.x, rect.y) != self.positions[index]:
+            self.remove(index)
+            self.add(index, rect)
+
+    def near(self, x, y, distance):
+        '''
+        Get indexes of rectangles whose top left corner may be less than
+        distance from (x, y) in each axis.
+        '''
+
+        min_cell = self._get_cell(x - distance, y - distance)
+        max_cell = self._get_cell(x + distance, y + distance)
+        indexes = []
+
+        for cell_x in range(min_cell[0], max_cell[0] + 1):
+            for cell_y in range(min_cell[1], max_cell[1] + 1):
+                indexes.extend(self.cells.get((cell_x, cell_y), ()))
+
+        return indexes
+
+
+def remove_equal_rects(rects, cell_size=5):
+    '''
+    Remove rectangles equal to a previous one, keeping input order.
+    '''
+
+    grid = RectGrid(cell_size)
+    unique_rects = []
+
+    for rect in rects:
+        # Equal rectangles have corners less than 2 pixels apart.
+        if any(unique_rects[index].equal(rect) for index in grid.near(rect.x, rect.y, 2)):
+            continue
+
+        grid.add(len(unique_rects), rect)
+        unique_rects.append(rect)
+
+    return unique_rects
+
+def remove_rects_equal_to(rects, references, cell_size=5):
+    '''
+    Remove rectangles equal to one of references, keeping input order.
+    Rectangles equal among themselves are kept.
+    '''
+
+    grid = RectGrid(cell_size)
+
+    for index, reference in enumerate(references):
+        grid.add(index, reference)
+
+    # Equal rectangles have corners less than 2 pixels apart.
+    return [rect for rect in rects \
+            if not any(references[index].equal(rect) for index in grid.near(rect.x, rect.y, 2))]
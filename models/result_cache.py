@@ -0,0 +1,93 @@
+from collections import OrderedDict
+import copy
+import hashlib
+import threading
+
+import numpy as np
+
+
+class ResultCache:
+    '''
+    Least recently used cache of recognition results, keyed by image content
+    and models fingerprint. It may be shared by threads.
+    '''
+    
+    def __init__(self, max_entries=1024, fingerprint=""):
+        self.max_entries = max_entries
+        self.fingerprint = fingerprint or ""
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+    
+    def get_key(self, image, variant=""):
+        '''
+        Get key of decoded pixels of image, processed with parameters
+        identified by variant.
+        '''
+        
+        key = hashlib.md5(self.fingerprint)
+        key.update(variant)
+        
+        # Same pixels encoded in other format or with other metadata have
+        # the same key.
+        data = np.ascontiguousarray(image.data)
+        key.update(str(data.shape) + str(data.dtype))
+        key.update(data.data)
+        
+        return key.digest()
+    
+    def get(self, key):
+        '''
+        Get quadrilateral and plate cached, or None if key is not cached.
+        '''
+        
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            
+            # Move entry to end, as most recently used.
+            result = self.entries.pop(key)
+            self.entries[key] = result
+            self.hits += 1
+        
+        return copy.deepcopy(result)
+    
+    def put(self, key, quadrilateral, plate):
+        '''
+        Cache quadrilateral and plate.
+        '''
+        
+        result = copy.deepcopy((quadrilateral, plate))
+        
+        with self.lock:
+            if key in self.entries:
+                del self.entries[key]
+            elif len(self.entries) >= self.max_entries:
+                # Remove least recently used entry.
+                self.entries.popitem(last=False)
+                self.evictions += 1
+                
+            self.entries[key] = result
+    
+    def clear(self):
+        '''
+        Remove all entries.
+        '''
+        
+        with self.lock:
+            self.entries.clear()
+    
+    def hit_rate(self):
+        '''
+        Get rate of lookups found in cache.
+        '''
+        
+        total = self.hits + self.misses
+        
+        if total == 0:
+            return 0.0
+        
+        return self.hits * 1.0 / total
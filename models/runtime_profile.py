@@ -0,0 +1,152 @@
+import json
+import os
+
+from models.rect import Rect
+
+
+DEFAULT_PROFILES_PATH = os.environ.get("LPDETECT_PROFILES", "runtime_profiles.json")
+PARAMETERS = ["resize_width", "scale_factors", "neighbors", "min_size", "single_pass_cascade", "contour_rectangles", \
+              "median_retry", "candidate_top_k", "early_stop_characters", "max_recrops", "character_blur_size", \
+              "ransac_iterations"]
+
+
+class RuntimeProfile:
+    '''
+    Speed-critical parameters of pipeline. Defaults are the values used
+    without profile.
+    
+    All parameters may be chosen for each image: detection width, cascade
+    passes, if contour rectangles are searched, if SVM tries median filtered
+    candidates again, candidates analyzed for characters, recrops done while
+    adjusting characters, RANSAC iterations of character fitting and blur
+    size of character features. Detector sets the last two on license
+    plates it finds.
+    '''
+
+    def __init__(self, resize_width=400, scale_factors=None, neighbors=None, min_size=(8, 16), \
+                 single_pass_cascade=False, contour_rectangles=True, median_retry=True, candidate_top_k=10, \
+                 early_stop_characters=7, max_recrops=None, character_blur_size=49, ransac_iterations=200):
+        self.resize_width = resize_width
+        self.scale_factors = scale_factors if scale_factors is not None else [float(i) / 10 for i in range(11, 15)]
+        self.neighbors = neighbors if neighbors is not None else range(2, 5)
+        self.min_size = tuple(min_size)
+        self.single_pass_cascade = single_pass_cascade
+        self.contour_rectangles = contour_rectangles
+        self.median_retry = median_retry
+        self.candidate_top_k = candidate_top_k
+        self.early_stop_characters = early_stop_characters
+        self.max_recrops = max_recrops
+        self.character_blur_size = character_blur_size
+        self.ransac_iterations = ransac_iterations
+        self.fingerprint = None
+
+        if character_blur_size % 2 == 0:
+            raise ValueError("Character blur size must be odd.")
+
+    @classmethod
+    def from_dict(cls, parameters):
+        '''
+        Create profile from dictionary of parameters. Missing parameters use
+        defaults.
+        '''
+
+        unknown = [name for name in parameters if name not in PARAMETERS]
+
+        if len(unknown) > 0:
+            raise ValueError("Unknown profile parameters: " + ", ".join(sorted(unknown)) + ".")
+
+        return cls(**parameters)
+
+    def to_dict(self):
+        '''
+        Get dictionary of parameters.
+        '''
+
+        return {"resize_width": self.resize_width, "scale_factors": list(self.scale_factors), \
+                "neighbors": list(self.neighbors), "min_size": list(self.min_size), \
+                "single_pass_cascade": self.single_pass_cascade, "contour_rectangles": self.contour_rectangles, \
+                "median_retry": self.median_retry, "candidate_top_k": self.candidate_top_k, \
+                "early_stop_characters": self.early_stop_characters, "max_recrops": self.max_recrops, \
+                "character_blur_size": self.character_blur_size, "ransac_iterations": self.ransac_iterations}
+
+    def with_resize_width(self, resize_width):
+        '''
+        Get copy of profile with other detection width.
+        '''
+
+        parameters = self.to_dict()
+        parameters["resize_width"] = resize_width
+
+        return RuntimeProfile.from_dict(parameters)
+
+    def get_fingerprint(self):
+        '''
+        Get string identifying parameters, to key results computed with them.
+        Profiles must not be changed after first call.
+        '''
+
+        if self.fingerprint is None:
+            self.fingerprint = json.dumps(self.to_dict(), sort_keys=True)
+
+        return self.fingerprint
+
+    def apply(self, pipeline):
+        '''
+        Use profile as default profile of detector. Its blur size and RANSAC
+        iterations are also used for license plates found without profile.
+        '''
+
+        pipeline.detector.profile = self
+
+        pipeline.recognizer.set_character_blur_size(self.character_blur_size)
+
+        Rect.ransac_iterations = self.ransac_iterations
+
+
+# Named profiles available without profiles file. Balanced uses the same
+# parameters used without profile.
+PROFILES = {"fast": RuntimeProfile(resize_width=320, scale_factors=[1.2], neighbors=[3], contour_rectangles=False, \
+                                   median_retry=False, candidate_top_k=3, max_recrops=1),
+            "balanced": RuntimeProfile(),
+            "accurate": RuntimeProfile(scale_factors=[1.05, 1.1, 1.2, 1.3, 1.4], neighbors=range(1, 5), \
+                                       candidate_top_k=None, early_stop_characters=None)}
+
+
+def read_profiles(path=DEFAULT_PROFILES_PATH):
+    '''
+    Read profiles file as dictionary of name to parameters and metrics.
+    '''
+
+    if not os.path.isfile(path):
+        return {}
+
+    with open(path) as profiles_file:
+        return json.load(profiles_file)
+
+def load_profile(name, path=DEFAULT_PROFILES_PATH):
+    '''
+    Load profile with name from profiles file, or named profile available
+    without file. Profiles of file replace profiles with the same name.
+    '''
+
+    profiles = read_profiles(path)
+
+    if name in profiles:
+        return RuntimeProfile.from_dict(profiles[name]["parameters"])
+
+    if name in PROFILES:
+        return PROFILES[name]
+
+    raise KeyError("Unknown profile " + name + ".")
+
+def save_profile(name, profile, metrics=None, path=DEFAULT_PROFILES_PATH):
+    '''
+    Save profile with name in profiles file, with metrics measured using it.
+    Other profiles of file are kept.
+    '''
+
+    profiles = read_profiles(path)
+    profiles[name] = {"parameters": profile.to_dict(), "metrics": metrics if metrics is not None else {}}
+
+    with open(path, "w") as profiles_file:
+        json.dump(profiles, profiles_file, indent=2, sort_keys=True)
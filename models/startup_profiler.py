@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+import sys
+import time
+
+
+class StartupProfiler:
+    '''
+    Measure time spent on each startup stage.
+    '''
+    
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.stages = []
+        self.start = time.time()
+    
+    @contextmanager
+    def stage(self, name):
+        '''
+        Measure time spent on stage.
+        '''
+        
+        start = time.time()
+        
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.stages.append((name, time.time() - start))
+    
+    def report(self, output_file=sys.stderr):
+        '''
+        Write time spent on each stage.
+        '''
+        
+        if self.enabled:
+            for name, elapsed_time in self.stages:
+                output_file.write("%-20s %8.1f ms\n" % (name, elapsed_time * 1000))
+            
+            output_file.write("%-20s %8.1f ms\n" % ("total", (time.time() - self.start) * 1000))
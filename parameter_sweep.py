@@ -0,0 +1,192 @@
+from argparse import ArgumentParser
+import itertools
+import json
+import random
+import sys
+
+from evaluate import Evaluator
+from models.runtime_profile import RuntimeProfile, DEFAULT_PROFILES_PATH, save_profile
+
+
+# Values of each parameter searched. Resize of character HOG is not searched,
+# it must match window of HOG descriptor used to train character classifiers.
+SWEEP_GRID = {"resize_width": [320, 400, 480],
+              "scale_factors": [[1.1, 1.2, 1.3, 1.4], [1.1, 1.3], [1.2], [1.1]],
+              "neighbors": [[2, 3, 4], [2, 4], [3]],
+              "min_size": [[8, 16], [12, 24]],
+              "single_pass_cascade": [False, True],
+              "character_blur_size": [33, 49],
+              "ransac_iterations": [50, 200]}
+
+
+def normalize_point(point):
+    '''
+    Get point with values not used by detection collapsed. Single pass
+    cascade only scans at its finest scale factor.
+    '''
+
+    point = dict(point)
+
+    if point.get("single_pass_cascade") and "scale_factors" in point:
+        point["scale_factors"] = [min(point["scale_factors"])]
+
+    return point
+
+def get_grid_points(grid):
+    '''
+    Get all distinct combinations of values of grid, so combinations running
+    the same detection are evaluated once.
+    '''
+
+    names = sorted(grid)
+    points = []
+    keys = set()
+
+    for values in itertools.product(*[grid[name] for name in names]):
+        point = normalize_point(dict(zip(names, values)))
+        key = json.dumps(point, sort_keys=True)
+
+        if key not in keys:
+            keys.add(key)
+            points.append(point)
+
+    return points
+
+def get_random_points(grid, samples, seed=0):
+    '''
+    Get samples distinct combinations of values of grid, chosen at random.
+    '''
+
+    points = get_grid_points(grid)
+    random.Random(seed).shuffle(points)
+
+    return points[:samples]
+
+def dominates(point, other):
+    '''
+    Check if point is not worse than other in plate accuracy, mean latency
+    and p99 latency, and better in at least one of them.
+    '''
+
+    point_values = (-point["summary"]["plate_accuracy"], point["summary"]["mean_ms"], point["summary"]["p99_ms"])
+    other_values = (-other["summary"]["plate_accuracy"], other["summary"]["mean_ms"], other["summary"]["p99_ms"])
+
+    return all([a <= b for a, b in zip(point_values, other_values)]) and point_values != other_values
+
+def get_pareto_front(points):
+    '''
+    Get points not dominated by other points, sorted by mean latency.
+    '''
+
+    front = [point for point in points if not any([dominates(other, point) for other in points])]
+    return sorted(front, key=lambda point: point["summary"]["mean_ms"])
+
+def choose_point(front, max_accuracy_loss):
+    '''
+    Choose fastest point of front with plate accuracy at most
+    max_accuracy_loss below best plate accuracy.
+    '''
+
+    best_accuracy = max([point["summary"]["plate_accuracy"] for point in front])
+    candidates = [point for point in front if point["summary"]["plate_accuracy"] >= best_accuracy - max_accuracy_loss]
+
+    return min(candidates, key=lambda point: point["summary"]["mean_ms"])
+
+def sweep(pipeline, image_paths, parameter_points, workers=None, output_file=sys.stderr):
+    '''
+    Evaluate pipeline with parameters of each point. Return list of
+    parameters and summary of each point.
+    '''
+
+    points = []
+
+    for index in range(len(parameter_points)):
+        parameters = parameter_points[index]
+
+        # Workers forked by evaluator inherit parameters.
+        RuntimeProfile.from_dict(parameters).apply(pipeline)
+        evaluator = Evaluator(pipeline, workers)
+
+        for _ in evaluator.evaluate(image_paths):
+            pass
+
+        summary = evaluator.summary()
+        points.append({"parameters": parameters, "summary": summary})
+        output_file.write("%d/%d plate accuracy: %.2f%% mean: %.1f ms p99: %.1f ms %s\n" % \
+                          (index + 1, len(parameter_points), summary["plate_accuracy"] * 100, summary["mean_ms"], \
+                           summary["p99_ms"], json.dumps(parameters, sort_keys=True)))
+
+    return points
+
+
+if __name__ == '__main__':
+    '''
+    Search parameters for plate accuracy and latency, writing chosen
+    parameters as runtime profile.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Search parameters for plate accuracy and latency.')
+    arg_parser.add_argument('image_paths', nargs='*', help='Annotated image paths or directories')
+    arg_parser.add_argument('-c', '--config', dest='config_file', default='config.ini', help='Configuration file')
+    arg_parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=None, help='Number of worker processes')
+    arg_parser.add_argument('-s', '--search', dest='search', choices=['grid', 'random'], default='random', help='Search strategy')
+    arg_parser.add_argument('-n', '--samples', dest='samples', type=int, default=20, help='Number of points of random search')
+    arg_parser.add_argument('--seed', dest='seed', type=int, default=0, help='Random seed of random search')
+    arg_parser.add_argument('-g', '--grid', dest='grid', help='JSON file with values of each parameter searched')
+    arg_parser.add_argument('-o', '--output', dest='output', default='sweep.jsonl', help='JSON lines file with result of each point')
+    arg_parser.add_argument('--max-accuracy-loss', dest='max_accuracy_loss', type=float, default=0.01, \
+                            help='Plate accuracy below best accuracy accepted for chosen point')
+    arg_parser.add_argument('-p', '--profile', dest='profile', help='Name of runtime profile written with chosen point')
+    arg_parser.add_argument('--profiles', dest='profiles_path', default=DEFAULT_PROFILES_PATH, help='Runtime profiles file')
+    args = vars(arg_parser.parse_args())
+
+    from lpdetect import get_image_paths
+    from recognition_pipeline import load_pipeline
+
+    image_arguments = args['image_paths']
+
+    if len(image_arguments) == 0:
+        # Use testing directory of configuration file.
+        from models.cached_config import read_config
+        image_arguments = [read_config(args['config_file'])['testing']['path_test']]
+
+    grid = SWEEP_GRID
+
+    if args['grid']:
+        with open(args['grid']) as grid_file:
+            grid = json.load(grid_file)
+
+    if args['search'] == 'grid':
+        parameter_points = get_grid_points(grid)
+    else:
+        parameter_points = get_random_points(grid, args['samples'], args['seed'])
+
+    # Load models once in parent process, before forking workers.
+    pipeline = load_pipeline(config_file=args['config_file'])
+    pipeline.warmup()
+
+    image_paths = list(get_image_paths(image_arguments))
+
+    if len(image_paths) == 0:
+        print "No images to evaluate."
+        sys.exit(1)
+
+    points = sweep(pipeline, image_paths, parameter_points, args['jobs'])
+
+    with open(args['output'], "w") as output_file:
+        for point in points:
+            output_file.write(json.dumps(point, sort_keys=True) + "\n")
+
+    front = get_pareto_front(points)
+    print "Pareto front of plate accuracy, mean latency and p99 latency:"
+
+    for point in front:
+        print "plate accuracy: %6.2f%% mean: %7.1f ms p99: %7.1f ms %s" % \
+              (point["summary"]["plate_accuracy"] * 100, point["summary"]["mean_ms"], point["summary"]["p99_ms"], \
+               json.dumps(point["parameters"], sort_keys=True))
+
+    if args['profile'] and len(front) > 0:
+        chosen = choose_point(front, args['max_accuracy_loss'])
+        save_profile(args['profile'], RuntimeProfile.from_dict(chosen["parameters"]), chosen["summary"], args['profiles_path'])
+        print "Profile %s written to %s." % (args['profile'], args['profiles_path'])
@@ -0,0 +1,121 @@
+from models.point import Point
+
+
+class PlateTracker:
+    '''
+    Detect license plate in video frames, searching first around the plate
+    found in the previous frame.
+    '''
+
+    def __init__(self, detector, padding=0.5, full_detection_interval=10):
+        self.detector = detector
+        self.padding = padding
+        self.full_detection_interval = full_detection_interval
+        self.region = None
+        self.frames_since_full_detection = 0
+        self.tracked_detections = 0
+        self.full_detections = 0
+        self.tracking_failures = 0
+
+    # Default profile is the profile of detector tracked.
+    profile = property(lambda self: self.detector.profile)
+
+    def reset(self):
+        '''
+        Forget plate tracked.
+        '''
+
+        self.region = None
+        self.frames_since_full_detection = 0
+
+    def _get_region(self, quadrilateral, image):
+        '''
+        Get region around quadrilateral, padded by a fraction of its size.
+        '''
+
+        min_x = min(point.x for point in quadrilateral.points)
+        min_y = min(point.y for point in quadrilateral.points)
+        max_x = max(point.x for point in quadrilateral.points)
+        max_y = max(point.y for point in quadrilateral.points)
+        padding_x = int((max_x - min_x) * self.padding)
+        padding_y = int((max_y - min_y) * self.padding)
+
+        origin = Point(int(max(0, min_x - padding_x)), int(max(0, min_y - padding_y)))
+        end = Point(int(min(image.width - 1, max_x + padding_x)), int(min(image.height - 1, max_y + padding_y)))
+
+        if end.x - origin.x < 2 or end.y - origin.y < 2:
+            return None
+
+        return origin, end
+
+    def _detect_in_region(self, image, profile=None):
+        '''
+        Detect license plate in region around previous plate, returning it in
+        image coordinates. Region is detected at the scale of full frame
+        detection, so cascade sizes match and its cost follows its size.
+        '''
+
+        origin, end = self.region
+        region_image = image.crop(Point(origin.x, origin.y), Point(end.x, end.y))
+        profile = profile if profile is not None else self.detector.profile
+        resize_width = max(1, int(round(profile.resize_width * region_image.width * 1.0 / image.width)))
+        license_plate = self.detector.detect_license_plate(region_image, profile.with_resize_width(resize_width))
+
+        if license_plate is not None:
+            # Move license plate to image coordinates.
+            license_plate.x += origin.x
+            license_plate.y += origin.y
+
+            for point in license_plate.quadrilateral.points:
+                point.x += origin.x
+                point.y += origin.y
+
+        return license_plate
+
+    def detect_license_plate(self, image, profile=None):
+        '''
+        Detect license plate in frame, using parameters of profile if it is
+        given.
+        '''
+
+        if image.data is None:
+            raise ValueError('Error to open image.')
+
+        image.convert_to_gray()
+        license_plate = None
+
+        if self.region is not None and self.frames_since_full_detection < self.full_detection_interval:
+            license_plate = self._detect_in_region(image, profile)
+            self.frames_since_full_detection += 1
+
+            if license_plate is not None:
+                self.tracked_detections += 1
+            else:
+                self.tracking_failures += 1
+
+        if license_plate is None:
+            # Track lost or too many frames since last full detection.
+            license_plate = self.detector.detect_license_plate(image, profile)
+            self.frames_since_full_detection = 0
+            self.full_detections += 1
+
+        if license_plate is not None:
+            self.region = self._get_region(license_plate.quadrilateral, image)
+        else:
+            self.region = None
+
+        return license_plate
+
+    def warmup(self):
+        '''
+        Warm up detector.
+        '''
+
+        self.detector.warmup()
+
+    def close(self):
+        '''
+        Close detector.
+        '''
+
+        self.detector.close()
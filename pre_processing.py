@@ -68,7 +68,7 @@ def crop_image(image, quadrilateral, width_dest, height_dest):
             if end.x >= image.width:
                 end.x = image.width -1
         
-        logger.log(Logger.INFO, "Increasing width in " + str(end.x -origin.x -width))
+        logger.log(Logger.INFO, "Increasing width in %d", end.x -origin.x -width)
     else:
         # We need to increase height.
         increment = width*scale -height        
@@ -90,7 +90,7 @@ def crop_image(image, quadrilateral, width_dest, height_dest):
             if end.y >= image.height:
                 end.y = image.height -1
         
-        logger.log(Logger.INFO, "Increasing height in " + str(end.y -origin.y -height))       
+        logger.log(Logger.INFO, "Increasing height in %d", end.y -origin.y -height)       
     
     
     # Crop image using points from configuration data.
@@ -110,7 +110,7 @@ def save_training_images_paths(path_pre_processed_positive, path_pre_processed_n
     
     positive_path = "positive.txt"
     logger = Logger()
-    logger.log(Logger.INFO, "Saving positive paths in: " + positive_path)
+    logger.log(Logger.INFO, "Saving positive paths in: %s", positive_path)
     
     positive_file = open(positive_path, "w")
     for file_path in positive_training_images.paths:
@@ -120,7 +120,7 @@ def save_training_images_paths(path_pre_processed_positive, path_pre_processed_n
     positive_file.close()
     
     negative_path = "negative.txt"
-    logger.log(Logger.INFO, "Saving negative paths in: " + negative_path)
+    logger.log(Logger.INFO, "Saving negative paths in: %s", negative_path)
     
     negative_file = open(negative_path, "w")
     for file_path in negative_training_images.paths:
@@ -224,7 +224,7 @@ def pre_processing(argv):
      
     # Merging data for detector_training.
     path_training_vec_file = "positive.vec"
-    logger.log(Logger.INFO, "Merging data for detector_training in: " + path_training_vec_file)
+    logger.log(Logger.INFO, "Merging data for detector_training in: %s", path_training_vec_file)
     merge_vec_files(path_training_vec, path_training_vec_file)
     
 if __name__ == '__main__':
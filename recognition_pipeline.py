@@ -0,0 +1,408 @@
+import hashlib
+import os
+
+from detector import Detector
+from license_plate_recognizer import LicensePlateRecognizer
+from models.image_loader import load_image
+from models.instrumentation import instrumentation
+from models.logger import Logger
+from models.result_cache import ResultCache
+from models.runtime_profile import RuntimeProfile, load_profile
+
+
+NOT_FOUND = "None"
+OPEN_ERROR = "Error to open image."
+RECOGNITION_ERROR = "Error to recognize image."
+DEFAULT_BUNDLE_PATH = os.environ.get("LPDETECT_BUNDLE", "classifier/models.bundle")
+DEFAULT_CONFIG_FILE = os.environ.get("LPDETECT_CONFIG", "config.ini")
+DEFAULT_THREADS = int(os.environ.get("LPDETECT_THREADS", "1"))
+DEFAULT_PROFILE = os.environ.get("LPDETECT_PROFILE")
+
+
+def format_result(quadrilateral, plate):
+    '''
+    Format result as printed by lpdetect.
+    '''
+
+    if quadrilateral is None:
+        return NOT_FOUND
+
+    point1 = quadrilateral.points[0]
+    point2 = quadrilateral.points[1]
+    point3 = quadrilateral.points[2]
+    point4 = quadrilateral.points[3]
+
+    return str(point1.x) + "," + str(point1.y) + "," + \
+           str(point2.x) + "," + str(point2.y) + "," + \
+           str(point3.x) + "," + str(point3.y) + "," + \
+           str(point4.x) + "," + str(point4.y) + "," + plate
+
+
+def quadrilateral_to_list(quadrilateral):
+    '''
+    Convert quadrilateral to list of [x, y] points.
+    '''
+
+    if quadrilateral is None:
+        return None
+
+    return [[int(point.x), int(point.y)] for point in quadrilateral.points]
+
+def get_models_fingerprint(values):
+    '''
+    Get fingerprint of model files and parameters, using size and
+    modification time of files.
+    '''
+    
+    fingerprint = hashlib.sha1()
+    
+    for value in values:
+        fingerprint.update(str(value))
+        
+        if isinstance(value, basestring) and os.path.isfile(value):
+            status = os.stat(value)
+            fingerprint.update(str(status.st_size) + str(status.st_mtime))
+            
+    return fingerprint.hexdigest()
+
+def configure_logging(config):
+    '''
+    Set logger levels from logging section of parsed configuration, unless
+    they were set by environment variable LPDETECT_LOG.
+    '''
+    
+    if "LPDETECT_LOG" not in os.environ and "levels" in config.get("logging", {}):
+        try:
+            Logger.configure(config["logging"]["levels"])
+        except KeyError as error:
+            Logger(__name__).log(Logger.ERROR, "Unknown log level %s in configuration.", error)
+
+def split_record(record, records):
+    '''
+    Add stages and counts of record shared by many images to records of
+    each image, in equal parts.
+    '''
+    
+    if record is None or len(records) == 0:
+        return
+    
+    for image_record in records:
+        for name, duration in record["stages"].items():
+            image_record["stages"][name] = image_record["stages"].get(name, 0.0) + duration / len(records)
+        
+        for name, value in record["counts"].items():
+            image_record["counts"][name] = image_record["counts"].get(name, 0) + value * 1.0 / len(records)
+
+def create_pipeline(config, cache_size=0, threads=1):
+    '''
+    Create pipeline using model files from parsed configuration.
+    '''
+    
+    data = config['data']
+    training = config['training']
+    
+    return RecognitionPipeline(data['path_classifier'], data['path_svm_hog_detector'], data['path_svm_binary_detector'], \
+                               int(training['image_width']), int(training['image_height']), \
+                               int(training['character_width']), int(training['character_height']), \
+                               data['character_classifier_type'], data['path_letter_classifier'], data['path_number_classifier'], \
+                               data['path_number_knn_labels_classifier'], data['path_number_knn_images_classifier'], \
+                               data['path_letter_knn_labels_classifier'], data['path_letter_knn_images_classifier'], \
+                               cache_size=cache_size, threads=threads)
+
+def load_pipeline(bundle_path=DEFAULT_BUNDLE_PATH, config_file=DEFAULT_CONFIG_FILE, cache_size=0, threads=DEFAULT_THREADS, \
+                  profile=None):
+    '''
+    Load pipeline from model bundle if it exists, otherwise from model files
+    in configuration file, otherwise from default model files. If cache size
+    is positive, results of repeated images are cached. If threads is greater
+    than one, each image is detected using a pool of threads. Parameters of
+    runtime profile with name profile, or name in environment variable
+    LPDETECT_PROFILE, are used by default. Profiles of cameras are read from
+    camera_profiles section of configuration file.
+    '''
+    
+    config = None
+    
+    # Logging is configured before models are loaded, from bundle or files.
+    if config_file and os.path.isfile(config_file):
+        from models.cached_config import read_config
+        config = read_config(config_file)
+        configure_logging(config)
+    
+    if bundle_path and os.path.isfile(bundle_path):
+        from model_bundle import ModelBundle
+        pipeline = RecognitionPipeline(bundle=ModelBundle(bundle_path), cache_size=cache_size, threads=threads)
+    elif config is not None:
+        pipeline = create_pipeline(config, cache_size, threads)
+    else:
+        pipeline = RecognitionPipeline(cache_size=cache_size, threads=threads)
+    
+    if config is not None:
+        pipeline.camera_profiles = dict(config.get("camera_profiles", {}))
+    
+    profile = profile or DEFAULT_PROFILE
+    
+    if profile:
+        load_profile(profile).apply(pipeline)
+    
+    return pipeline
+
+
+class RecognitionPipeline:
+    '''
+    Detector and recognizer loaded once to process many images.
+    '''
+    
+    _logger = Logger(__name__)
+
+    def __init__(self, cascade_file="classifier/cascade.xml", \
+                 path_svm_hog_detector="classifier/svm_detector_hog.xml", \
+                 path_svm_binary_detector="classifier/svm_detector_binary.xml", \
+                 image_width=96, image_height=48, character_width=25, character_height=25, \
+                 character_classifier_type="svm_linear_hog", \
+                 path_letter_classifier="classifier/letter_classifier.xml", \
+                 path_number_classifier="classifier/number_classifier.xml", \
+                 path_number_knn_labels_classifier="classifier/number_knn_labels_classifier.xml", \
+                 path_number_knn_images_classifier="classifier/number_knn_images_classifier.xml", \
+                 path_letter_knn_labels_classifier="classifier/letter_knn_labels_classifier.xml", \
+                 path_letter_knn_images_classifier="classifier/letter_knn_images_classifier.xml", \
+                 bundle=None, cache_size=0, threads=1):
+        if bundle is not None:
+            # Use models and training geometry from bundle.
+            cascade_file = bundle.file_path("cascade")
+            path_svm_hog_detector = bundle.file_path("svm_hog_detector")
+            image_width = bundle.image_width
+            image_height = bundle.image_height
+            character_width = bundle.character_width
+            character_height = bundle.character_height
+            character_classifier_type = bundle.classifier_type
+            self.fingerprint = bundle.fingerprint
+        else:
+            self.fingerprint = get_models_fingerprint([cascade_file, path_svm_hog_detector, image_width, image_height, \
+                                                       character_width, character_height, character_classifier_type, \
+                                                       path_letter_classifier, path_number_classifier, \
+                                                       path_number_knn_labels_classifier, path_number_knn_images_classifier, \
+                                                       path_letter_knn_labels_classifier, path_letter_knn_images_classifier])
+        
+        # Results of repeated images.
+        if cache_size > 0:
+            self.cache = ResultCache(cache_size, self.fingerprint)
+        else:
+            self.cache = None
+        
+        self.detector = Detector(cascade_file, path_svm_hog_detector, path_svm_binary_detector, image_width, image_height, \
+                                 threads=threads)
+        self.recognizer = LicensePlateRecognizer(character_width, character_height, character_classifier_type, \
+                                                 path_letter_classifier, path_number_classifier, \
+                                                 path_number_knn_labels_classifier, path_number_knn_images_classifier, \
+                                                 path_letter_knn_labels_classifier, path_letter_knn_images_classifier, \
+                                                 bundle)
+        
+        # Profile name of each camera, and profiles already loaded by name.
+        self.camera_profiles = {}
+        self.profiles = {}
+        self.unknown_cameras = set()
+
+    def warmup(self):
+        '''
+        Load models and run dummy detection and prediction, so first request
+        has no extra latency.
+        '''
+        
+        self.detector.warmup()
+        self.recognizer.warmup()
+    
+    def load(self):
+        '''
+        Load models that are loaded on first use.
+        '''
+        
+        self.recognizer.load()
+    
+    def close(self):
+        '''
+        Stop threads used by detection.
+        '''
+        
+        self.detector.close()
+
+    def get_profile(self, profile=None, camera=None):
+        '''
+        Get runtime profile with name, or profile of camera if profile is not
+        given, otherwise default profile of detector.
+        '''
+        
+        if profile is None and camera is not None:
+            profile = self.camera_profiles.get(camera)
+            
+            # Log each unknown camera once, not on every request.
+            if profile is None and camera not in self.unknown_cameras:
+                self.unknown_cameras.add(camera)
+                self._logger.log(Logger.ERROR, "Camera %s has no entry in camera_profiles, using default profile.", \
+                                 camera)
+        
+        if profile is None:
+            return self.detector.profile
+        
+        if isinstance(profile, RuntimeProfile):
+            return profile
+        
+        if profile not in self.profiles:
+            self.profiles[profile] = load_profile(profile)
+        
+        return self.profiles[profile]
+
+    def recognize(self, image, record=None, profile=None):
+        '''
+        Detect and recognize license plate in image.
+        Return quadrilateral and plate, or (None, None) if no plate was found.
+        '''
+
+        return self.recognize_batch([image], None if record is None else [record], [profile])[0]
+    
+    def recognize_batch(self, images, records=None, profiles=None, errors=None):
+        '''
+        Detect license plates in many images, then recognize characters of
+        all plates with one call to each character classifier.
+        Return list of quadrilateral and plate of each image.
+        If instrumentation is enabled, a record is published for each image,
+        continuing records already started for images, as their decoding.
+        Profiles are profile names or runtime profiles of each image.
+        If errors is a list, it receives the exception raised while detecting
+        each image, or None, and images with errors get (None, None).
+        Otherwise, the first exception is raised.
+        
+        Candidates of each image are classified by the detector SVM in one
+        call, but not together with candidates of other images: HOG features
+        of each candidate dominate its cost, and they are not reduced by
+        batching.
+        '''
+        
+        results = [None] * len(images)
+        keys = [None] * len(images)
+        license_plates = []
+        license_plate_indexes = []
+        
+        if records is None:
+            records = [None] * len(images)
+        
+        if profiles is None:
+            profiles = [None] * len(images)
+        
+        if errors is not None:
+            errors[:] = [None] * len(images)
+        
+        for index in range(len(images)):
+            image = images[index]
+            
+            if records[index] is None:
+                records[index] = instrumentation.start_image(getattr(image, "file_path", None))
+            else:
+                instrumentation.resume_image(records[index])
+            
+            try:
+                best_license_plate, keys[index], results[index] = self._detect(image, profiles[index])
+            except Exception as error:
+                instrumentation.finish_image()
+                
+                if errors is None:
+                    raise
+                
+                # Error of one image must not fail other images of batch.
+                self._logger.log(Logger.ERROR, "Error to detect license plate: %s", error)
+                errors[index] = error
+                results[index] = (None, None)
+                continue
+            
+            if best_license_plate is not None:
+                license_plates.append(best_license_plate)
+                license_plate_indexes.append(index)
+            elif results[index] is None:
+                results[index] = (None, None)
+            
+            instrumentation.finish_image()
+        
+        # Characters of all plates are predicted together, time is split among
+        # images with plates.
+        instrumentation.start_image()
+        plates = self.recognizer.predict_batch(license_plates)
+        split_record(instrumentation.finish_image(), [records[index] for index in license_plate_indexes \
+                                                      if records[index] is not None])
+        
+        for record in records:
+            instrumentation.publish(record)
+        
+        for index, license_plate, plate in zip(license_plate_indexes, license_plates, plates):
+            results[index] = (license_plate.quadrilateral, plate)
+        
+        if self.cache is not None:
+            # Cache results not found in cache.
+            for index in range(len(images)):
+                if keys[index] is not None:
+                    self.cache.put(keys[index], *results[index])
+            
+        return results
+
+    def _detect(self, image, profile=None):
+        '''
+        Detect license plate in image, unless its result is cached. Return
+        license plate detected, cache key and cached result.
+        '''
+        
+        profile = self.get_profile(profile)
+        key = None
+        
+        if self.cache is not None:
+            # Hash image before detection converts it to gray.
+            key = self.cache.get_key(image, profile.get_fingerprint())
+            result = self.cache.get(key)
+            
+            if result is not None:
+                instrumentation.count("cache_hits")
+                return None, None, result
+        
+        return self.detector.detect_license_plate(image, profile), key, None
+
+    def recognize_image(self, image, record=None, profile=None):
+        '''
+        Recognize license plate in image and return the lpdetect result line.
+        '''
+
+        if image is None or image.data is None:
+            instrumentation.finish_image()
+            return OPEN_ERROR
+
+        quadrilateral, plate = self.recognize(image, record, profile)
+        return format_result(quadrilateral, plate)
+
+    def recognize_path(self, image_path, profile=None, camera=None):
+        '''
+        Recognize license plate in image file, using profile with name or
+        profile of camera if they are given.
+        '''
+
+        profile = self.get_profile(profile, camera)
+        record = instrumentation.start_image(image_path)
+
+        try:
+            image = load_image(image_path, detection_width=profile.resize_width)
+        except:
+            image = None
+
+        return self.recognize_image(image, record, profile)
+
+    def recognize_buffer(self, buffer, profile=None, camera=None):
+        '''
+        Recognize license plate in encoded image bytes, using profile with
+        name or profile of camera if they are given.
+        '''
+
+        profile = self.get_profile(profile, camera)
+        record = instrumentation.start_image()
+
+        try:
+            image = load_image(buffer=buffer, detection_width=profile.resize_width)
+        except:
+            image = None
+
+        return self.recognize_image(image, record, profile)
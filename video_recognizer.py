@@ -0,0 +1,170 @@
+from argparse import ArgumentParser
+import json
+import sys
+import time
+
+import cv2
+
+from models.image import Image
+from models.instrumentation import instrumentation
+from models.logger import Logger
+from plate_tracker import PlateTracker
+from recognition_pipeline import load_pipeline, quadrilateral_to_list
+
+
+def open_capture(source):
+    '''
+    Open video file or local camera. Source is a file path or a device number.
+    '''
+
+    if isinstance(source, basestring) and source.isdigit():
+        source = int(source)
+
+    capture = cv2.VideoCapture(source)
+
+    if not capture.isOpened():
+        raise ValueError('Error to open video ' + str(source) + '.')
+
+    return capture
+
+
+class VideoRecognizer:
+    '''
+    Recognize license plates in frames of video file or camera stream.
+    '''
+
+    def __init__(self, pipeline, stride=1):
+        self.pipeline = pipeline
+        self.stride = max(1, stride)
+        self.input_fps = 0.0
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.processing_time = 0.0
+        self.total_time = 0.0
+
+    def process(self, source):
+        '''
+        Recognize license plate in one of each stride frames. Yield one record
+        per processed frame with frame index, timestamp in seconds,
+        quadrilateral points and plate.
+        '''
+
+        capture = open_capture(source)
+        self.input_fps = capture.get(cv2.cv.CV_CAP_PROP_FPS)
+        self.frames_read = 0
+        self.frames_processed = 0
+        self.processing_time = 0.0
+        start = time.time()
+
+        try:
+            while True:
+                # Skip frames without decoding them.
+                if self.frames_read % self.stride != 0:
+                    if not capture.grab():
+                        break
+
+                    self.frames_read += 1
+                    continue
+
+                read, frame = capture.read()
+
+                if not read:
+                    break
+
+                frame_index = self.frames_read
+                self.frames_read += 1
+
+                # Cameras have no position, use time since start.
+                timestamp = capture.get(cv2.cv.CV_CAP_PROP_POS_MSEC) / 1000.0
+
+                if timestamp <= 0:
+                    timestamp = time.time() - start
+
+                # Detector works in gray scale, convert frame directly from bgr.
+                processing_start = time.time()
+                image = Image(image=cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+                quadrilateral, plate = self.pipeline.recognize(image)
+                self.processing_time += time.time() - processing_start
+                self.frames_processed += 1
+
+                yield {"frame": frame_index, "timestamp": round(timestamp, 3), \
+                       "quadrilateral": quadrilateral_to_list(quadrilateral), "plate": plate}
+        finally:
+            capture.release()
+            self.total_time = time.time() - start
+
+    def report(self, output_file=sys.stderr):
+        '''
+        Write sustained frame rate compared to input frame rate.
+        '''
+
+        if self.total_time > 0:
+            sustained_fps = self.frames_read / self.total_time
+            output_file.write("Read %d frames, processed %d (stride %d) in %.2f s\n" % \
+                              (self.frames_read, self.frames_processed, self.stride, self.total_time))
+            output_file.write("Sustained: %.2f frames/s, input: %.2f frames/s\n" % (sustained_fps, self.input_fps))
+
+        if self.frames_processed > 0:
+            output_file.write("Processing: %.1f ms/frame\n" % (self.processing_time * 1000 / self.frames_processed))
+            
+        if self.pipeline.cache is not None:
+            cache = self.pipeline.cache
+            output_file.write("Cache: %d hits, %d misses (%.1f%%)\n" % (cache.hits, cache.misses, cache.hit_rate() * 100))
+            
+        if isinstance(self.pipeline.detector, PlateTracker):
+            tracker = self.pipeline.detector
+            output_file.write("Tracked: %d, full detections: %d, tracking failures: %d\n" % \
+                              (tracker.tracked_detections, tracker.full_detections, tracker.tracking_failures))
+            detector = tracker.detector
+        else:
+            detector = self.pipeline.detector
+            
+        output_file.write("Frame cache: %d images reused, %d computed\n" % (detector.frame_cache_hits, detector.frame_cache_misses))
+        instrumentation.report(output_file)
+
+
+if __name__ == '__main__':
+    '''
+    Recognize license plates in video file or camera stream, writing JSON
+    lines.
+    '''
+
+    # Parses args.
+    arg_parser = ArgumentParser(description='Recognize license plates in video file or camera stream.')
+    arg_parser.add_argument('source', help='Video file path or camera device number')
+    arg_parser.add_argument('-s', '--stride', dest='stride', type=int, default=1, help='Process one of each stride frames')
+    arg_parser.add_argument('-t', '--track', dest='track', action='store_true', help='Search around plate of previous frame first')
+    arg_parser.add_argument('--cache-size', dest='cache_size', type=int, default=0, help='Number of results of repeated frames cached')
+    arg_parser.add_argument('-k', '--full-detection-interval', dest='full_detection_interval', type=int, default=10, \
+                            help='Maximum frames between full-frame detections when tracking')
+    arg_parser.add_argument('--log', dest='log', help='Logger levels, as "INFO,models.image=DEBUG"')
+    arg_parser.add_argument('--instrument', dest='instrument', nargs='?', const='-', \
+                            help='Measure time of pipeline stages, appending records to JSON lines file if given')
+    arg_parser.add_argument('--profile', dest='profile', help='Runtime profile, as fast, balanced or accurate')
+    args = vars(arg_parser.parse_args())
+
+    pipeline = load_pipeline(cache_size=args['cache_size'], profile=args['profile'])
+    
+    if args['log']:
+        Logger.configure(args['log'])
+        
+    if args['instrument']:
+        instrumentation.enable(args['instrument'] if args['instrument'] != '-' else None)
+        
+    pipeline.warmup()
+    
+    if args['track']:
+        pipeline.detector = PlateTracker(pipeline.detector, full_detection_interval=args['full_detection_interval'])
+        
+    video_recognizer = VideoRecognizer(pipeline, args['stride'])
+
+    try:
+        for record in video_recognizer.process(args['source']):
+            sys.stdout.write(json.dumps(record) + "\n")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.close()
+
+    video_recognizer.report()